@@ -0,0 +1,172 @@
+"""Attendance-rate analytics over a sparse participant x session matrix.
+
+Sessions are meeting instances. A participant is expected at every session of a course from the
+first one they attended onwards (there is no enrolment list, so a course's roster is whoever has
+shown up) and counts as present with at least `present_minutes` in that session.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Minutes in a session before a participant counts as present
+PRESENT_MINUTES = 5
+# Students attending less than this share of their expected sessions are at risk...
+AT_RISK_RATE = 0.75
+# ...once they have been expected at this many sessions
+AT_RISK_MIN_SESSIONS = 3
+
+# Non-zero cells of the matrix for instances ingested after a given batch. Persons are
+# participant_rollup rowids; sessions are meeting_instances rowids, mapped to matrix columns.
+# CROSS JOIN keeps meeting_instances as the outer loop so only the new instances are read.
+ENTRIES_SQL = """
+    SELECT i.rowid AS session, p.rowid AS person, a.duration_minutes
+    FROM meeting_instances i
+    CROSS JOIN attendance a ON a.meeting_id = i.meeting_id AND a.instance_uuid = i.uuid
+    JOIN participant_rollup p ON p.user_email = a.user_email AND p.name = a.name
+    WHERE i.batch_id > ?
+"""
+
+
+class AttendanceMatrix:
+    """Minutes attended per (participant, session), held as coordinate arrays (COO).
+
+    Built once from the store; `refresh` then loads only instances ingested since the previous
+    call and drops the columns of instances that were re-synced or removed, so keeping it current
+    costs in proportion to the new data. One instance is shared by every session in the process.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.seen_batch = -1
+        self.sessions = pd.DataFrame({"meeting_id": pd.Series(dtype=object), "uuid": pd.Series(dtype=object),
+                                      "start_time": pd.Series(dtype="datetime64[ns]"), "batch_id": pd.Series(dtype="int64")})
+        self.columns = {}  # (meeting_id, uuid) -> column of its live session
+        self.alive = np.zeros(0, dtype=bool)
+        self.person = np.zeros(0, dtype=np.int64)
+        self.session = np.zeros(0, dtype=np.int64)
+        self.minutes = np.zeros(0, dtype=np.float32)
+
+    def refresh(self, store):
+        """Bring the matrix up to the store's current version."""
+        with self.lock:
+            version = store.version
+            if version == self.version:
+                return
+            with store.snapshot():
+                instances = store.query("SELECT rowid AS id, meeting_id, uuid, start_time, batch_id FROM meeting_instances")
+                fresh = instances[instances["batch_id"] > self.seen_batch]
+                entries = store.query(ENTRIES_SQL, (self.seen_batch,)) if len(fresh) else None
+
+            current = dict(zip(zip(instances["meeting_id"], instances["uuid"]), instances["batch_id"]))
+            batches = self.sessions["batch_id"].to_numpy()
+            gone = [col for key, col in self.columns.items() if current.get(key) != batches[col]]
+            if gone:
+                self.alive[gone] = False
+                keep = self.alive[self.session]
+                self.person, self.session, self.minutes = self.person[keep], self.session[keep], self.minutes[keep]
+                for key in [k for k, col in self.columns.items() if not self.alive[col]]:
+                    del self.columns[key]
+
+            if len(fresh):
+                first = len(self.sessions)
+                cols = pd.Series(np.arange(first, first + len(fresh)), index=fresh["id"].to_numpy())
+                added = pd.DataFrame({
+                    "meeting_id": fresh["meeting_id"].to_numpy(), "uuid": fresh["uuid"].to_numpy(),
+                    "start_time": pd.to_datetime(fresh["start_time"], utc=True, errors="coerce", format="ISO8601")
+                                    .dt.tz_localize(None).to_numpy(dtype="datetime64[ns]"),
+                    "batch_id": fresh["batch_id"].to_numpy(dtype="int64"),
+                })
+                self.sessions = pd.concat([self.sessions, added], ignore_index=True)
+                self.alive = np.r_[self.alive, np.ones(len(fresh), dtype=bool)]
+                self.columns.update(zip(zip(added["meeting_id"], added["uuid"]), cols.to_numpy()))
+                self.person = np.r_[self.person, entries["person"].to_numpy(dtype=np.int64)]
+                self.session = np.r_[self.session, cols.reindex(entries["session"].to_numpy()).to_numpy(dtype=np.int64)]
+                self.minutes = np.r_[self.minutes, entries["duration_minutes"].to_numpy(dtype=np.float32)]
+                self.seen_batch = int(instances["batch_id"].max())
+            self.version = version
+
+    def __len__(self):
+        return len(self.minutes)
+
+
+def attendance_rates(matrix, present_minutes=PRESENT_MINUTES):
+    """Attendance rates from the matrix as it is now.
+
+    Returns a dict of frames: `courses` (meeting_id), `students` (person), `sessions` (one row per
+    session with its course, number in the course and week), `weeks`, `retention` (share of a
+    course's students who attend again at or after each session), plus the `overall` rate.
+    """
+    with matrix.lock:
+        sessions = matrix.sessions[matrix.alive].copy()
+        person, session, minutes = matrix.person, matrix.session, matrix.minutes
+
+    # Number sessions within each course in start order; legacy whole-meeting rows come first
+    sessions = sessions.sort_values(["meeting_id", "start_time"], na_position="first", kind="stable")
+    sessions["number"] = sessions.groupby("meeting_id", sort=False).cumcount()
+    course_codes, courses = pd.factorize(sessions["meeting_id"])
+    sessions["course"] = course_codes
+    held = np.bincount(course_codes, minlength=len(courses))
+    # Position of each session in the (course, number) order, used to index per-session arrays
+    offset = np.cumsum(held) - held
+    sessions["pos"] = offset[course_codes] + sessions["number"].to_numpy()
+
+    n_cols = len(matrix.alive)
+    course_of = np.full(n_cols, -1, dtype=np.int64)
+    number_of = np.full(n_cols, -1, dtype=np.int64)
+    course_of[sessions.index] = course_codes
+    number_of[sessions.index] = sessions["number"].to_numpy()
+
+    present = (minutes >= present_minutes) & (course_of[session] >= 0)
+    cells = pd.DataFrame({"person": person[present], "course": course_of[session[present]], "number": number_of[session[present]]})
+    pairs = cells.groupby(["person", "course"], sort=False)["number"].agg(["min", "max", "size"]).reset_index()
+    pairs["expected"] = held[pairs["course"].to_numpy()] - pairs["min"].to_numpy()
+
+    # Per session: students expected so far (first seen at or before it) and those who come back later
+    pos_first = offset[pairs["course"].to_numpy()] + pairs["min"].to_numpy()
+    pos_last = offset[pairs["course"].to_numpy()] + pairs["max"].to_numpy()
+    n_pos = int(held.sum())
+    starts = np.bincount(pos_first, minlength=n_pos)
+    ends = np.bincount(pos_last, minlength=n_pos)
+    # Running totals restarted at each course's first session
+    expected_at = np.cumsum(starts) - np.repeat(np.r_[0, np.cumsum(starts)][offset], held)
+    dropped_before = np.cumsum(ends) - ends - np.repeat(np.r_[0, np.cumsum(ends)][offset], held)
+
+    pos = sessions["pos"].to_numpy()
+    sessions["attended"] = np.bincount(offset[cells["course"].to_numpy()] + cells["number"].to_numpy(), minlength=n_pos)[pos]
+    sessions["expected"] = expected_at[pos]
+    sessions["retained"] = expected_at[pos] - dropped_before[pos]
+    start = sessions["start_time"]
+    sessions["week"] = (start - pd.to_timedelta(start.dt.weekday, unit="D")).dt.normalize()
+
+    by_course = pairs.groupby("course").agg(students=("person", "size"), attended=("size", "sum"), expected=("expected", "sum"))
+    by_course = by_course.reindex(range(len(courses)), fill_value=0)
+    by_course.insert(0, "meeting_id", np.asarray(courses))
+    by_course["sessions"] = held
+    by_course["rate"] = by_course["attended"] / by_course["expected"].where(by_course["expected"] > 0)
+
+    by_student = pairs.groupby("person").agg(courses=("course", "size"), attended=("size", "sum"), expected=("expected", "sum")).reset_index()
+    by_student["rate"] = by_student["attended"] / by_student["expected"]
+
+    weeks = sessions.dropna(subset=["week"]).groupby("week").agg(sessions=("pos", "size"), attended=("attended", "sum"), expected=("expected", "sum")).reset_index()
+    weeks["rate"] = weeks["attended"] / weeks["expected"].where(weeks["expected"] > 0)
+
+    retention = sessions[["meeting_id", "number", "retained", "expected"]].copy()
+    retention["session"] = retention["number"] + 1
+    retention["retention"] = retention["retained"] / retention["expected"].where(retention["expected"] > 0)
+
+    expected = int(pairs["expected"].sum())
+    return {
+        "overall": pairs["size"].sum() / expected if expected else None,
+        "courses": by_course.reset_index(drop=True),
+        "students": by_student,
+        "sessions": sessions.drop(columns=["pos", "course"]).reset_index(drop=True),
+        "weeks": weeks,
+        "retention": retention.drop(columns=["number"]).reset_index(drop=True),
+    }
+
+
+def at_risk(students, threshold=AT_RISK_RATE, min_sessions=AT_RISK_MIN_SESSIONS):
+    """Students below `threshold` after at least `min_sessions` expected sessions, lowest rate first."""
+    risky = students[(students["expected"] >= min_sessions) & (students["rate"] < threshold)]
+    return risky.sort_values(["rate", "expected"], ascending=[True, False])
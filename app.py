@@ -1,71 +1,78 @@
 import streamlit as st
-import requests
-import pandas as pd
-import base64
-import plotly.express as px
-from urllib.parse import urlencode
-import os
 from datetime import datetime
 import streamlit.components.v1 as components
+import metrics
+from zoom_client import ZoomAPIError, ZoomClient, RateLimiter, make_session, login_url, AUTHORIZE_URL, ZOOM_RATE_PER_SEC, ZOOM_DAILY_LIMIT, POOL_SIZE
+
+# The data stack (pandas, numpy, plotly and the modules built on them: store, frame_cache, views,
+# sync) is imported inside the functions that use it, so logged-out visitors on the landing page
+# never pay for it. `python bench.py --only startup` measures this path.
 
 # --- 1. CONFIGURATION ---
 st.set_page_config(page_title="ZoomAttendance.io", page_icon="⚡", layout="wide", initial_sidebar_state="expanded")
 
-# DATABASE (Local CSV files)
+# DATABASE (SQLite). The old CSV files are imported once and renamed to *.migrated.
 COURSES_DB = 'courses.csv'
 ATTENDANCE_DB = 'attendance_cache.csv'
 
-# Initialize DB if not exists
-if not os.path.exists(COURSES_DB):
-    pd.DataFrame(columns=["meeting_id", "course_name", "date_added"]).to_csv(COURSES_DB, index=False)
-if not os.path.exists(ATTENDANCE_DB):
-    pd.DataFrame(columns=["meeting_id", "user_email", "name", "duration_minutes", "sync_date"]).to_csv(ATTENDANCE_DB, index=False)
+@st.cache_resource
+def get_frame_cache():
+    from frame_cache import FrameCache
+    return FrameCache()
+
+@st.cache_resource
+def get_store():
+    from store import AttendanceStore, STORE_DB
+    store = AttendanceStore(STORE_DB)
+    store.import_csv(COURSES_DB, ATTENDANCE_DB)
+    store.subscribe(get_frame_cache().invalidate)
+    store.start_compactor()
+    return store
+
+@st.cache_resource
+def get_attendance_matrix():
+    from analytics import AttendanceMatrix
+    return AttendanceMatrix()
+
+def cached(key, build):
+    """Data derived from the store, shared by all sessions and reruns until the next write. Do not mutate the result."""
+    return get_frame_cache().get(key, get_store().version, build)
 
 # --- 2. ZOOM API & AUTH ---
 try:
     CLIENT_ID = st.secrets["zoom"]["client_id"]
     CLIENT_SECRET = st.secrets["zoom"]["client_secret"]
     REDIRECT_URI = st.secrets["zoom"]["redirect_uri"]
+    # Optional overrides, e.g. to point the app at fake_zoom.py during development
+    ZOOM_ENDPOINTS = {k: st.secrets["zoom"][k] for k in ("authorize_url", "token_url", "api_base") if k in st.secrets["zoom"]}
 except:
     st.error("Missing Zoom Secrets in Streamlit Cloud.")
     st.stop()
 
-AUTHORIZE_URL = "https://zoom.us/oauth/authorize"
-TOKEN_URL = "https://zoom.us/oauth/token"
+# Users (by Zoom email) who see the diagnostics panel, from an optional [admin] section:
+#   [admin]
+#   emails = ["ops@example.edu"]
+ADMIN_EMAILS = {e.strip().lower() for e in st.secrets.get("admin", {}).get("emails", [])}
 
-def get_login_url():
-    params = {"response_type": "code", "client_id": CLIENT_ID, "redirect_uri": REDIRECT_URI}
-    return f"{AUTHORIZE_URL}?{urlencode(params)}"
-
-def exchange_code_for_token(auth_code):
-    auth_string = f"{CLIENT_ID}:{CLIENT_SECRET}"
-    b64_auth = base64.b64encode(auth_string.encode()).decode()
-    headers = {"Authorization": f"Basic {b64_auth}", "Content-Type": "application/x-www-form-urlencoded"}
-    params = {"grant_type": "authorization_code", "code": auth_code, "redirect_uri": REDIRECT_URI}
-    try:
-        return requests.post(TOKEN_URL, headers=headers, params=params).json()
-    except:
-        return {"error": "Connection failed"}
-
-def fetch_meeting_participants(token, meeting_id):
-    clean_id = str(meeting_id).replace(" ", "")
-    headers = {"Authorization": f"Bearer {token}"}
-    params = {"page_size": 300}
-    
-    # Using "Past Meetings" endpoint (Works with Basic/Pro permissions)
-    url = f"https://api.zoom.us/v2/past_meetings/{clean_id}/participants"
+SESSIONS_PER_PAGE = 20
+PARTICIPANTS_PER_PAGE = 30
+AT_RISK_ROWS = 1000
 
-    res = requests.get(url, headers=headers, params=params)
-    
-    if res.status_code == 200:
-        parts = res.json().get('participants', [])
-        for p in parts:
-             if 'duration' not in p:
-                 p['duration'] = 60 * 60 # Default 60 mins if missing
-        return parts, None
-        
-    error_msg = f"Zoom Error {res.status_code}: {res.json().get('message', 'Unknown error')}"
-    return None, error_msg
+@st.cache_resource
+def get_http_session():
+    from sync import SYNC_WORKERS
+    return make_session(max(POOL_SIZE, SYNC_WORKERS))
+
+@st.cache_resource
+def get_rate_limiter():
+    return RateLimiter(ZOOM_RATE_PER_SEC, ZOOM_DAILY_LIMIT)
+
+def new_zoom_client():
+    return ZoomClient(CLIENT_ID, CLIENT_SECRET, REDIRECT_URI, session=get_http_session(), limiter=get_rate_limiter(), **ZOOM_ENDPOINTS)
+
+def get_login_url():
+    # Only builds a URL, so no client, HTTP session or sync module is created for the landing page
+    return login_url(CLIENT_ID, REDIRECT_URI, ZOOM_ENDPOINTS.get("authorize_url", AUTHORIZE_URL))
 
 # --- 3. LANDING PAGE (YOUR NEW DESIGN) ---
 def show_landing_page():
@@ -258,8 +265,11 @@ def show_dashboard_interface():
         menu = st.radio("MENU", ["Dashboard", "Participants", "Sessions", "Reports"], label_visibility="collapsed")
         st.markdown("---")
         if st.button("Logout", use_container_width=True):
-            del st.session_state["access_token"]
+            del st.session_state["zoom_client"]
+            st.session_state.pop("user_email", None)
             st.rerun()
+        if st.session_state.get("user_email") in ADMIN_EMAILS:
+            show_diagnostics()
 
     # Router
     if menu == "Dashboard":
@@ -271,24 +281,59 @@ def show_dashboard_interface():
     elif menu == "Reports":
         page_reports()
 
+def show_diagnostics():
+    """Admin-only view of the process-wide metrics (all sessions since the server started)."""
+    with st.expander("🩺 Diagnostics"):
+        snapshot = metrics.REGISTRY.snapshot()
+        if not snapshot:
+            st.caption("No metrics recorded yet.")
+            return
+        import pandas as pd
+        def labels(row):
+            return ", ".join(f"{k}={v}" for k, v in row["labels"].items())
+        st.markdown("**Latency (ms)**")
+        st.dataframe(pd.DataFrame(
+            [{"metric": r["name"], "labels": labels(r), "count": r["count"],
+              "p50": r["p50"] * 1000, "p95": r["p95"] * 1000, "total": r["sum"] * 1000}
+             for r in snapshot if r["type"] == "histogram"],
+            columns=["metric", "labels", "count", "p50", "p95", "total"]), hide_index=True, use_container_width=True)
+        st.markdown("**Counters**")
+        st.dataframe(pd.DataFrame(
+            [{"name": r["name"], "labels": labels(r), "value": r["value"]} for r in snapshot if r["type"] != "histogram"],
+            columns=["name", "labels", "value"]), hide_index=True, use_container_width=True)
+        c1, c2 = st.columns(2)
+        c1.download_button("Prometheus", metrics.REGISTRY.prometheus(), "metrics.prom", "text/plain", use_container_width=True)
+        c2.download_button("JSON lines", metrics.REGISTRY.json_lines(), "metrics.jsonl", "application/x-ndjson", use_container_width=True)
+        if st.button("Reset metrics", use_container_width=True):
+            metrics.REGISTRY.reset()
+            st.rerun()
+
+def format_rate(rate):
+    return "—" if rate is None or rate != rate else f"{rate:.0%}"
+
 # --- PAGE FUNCTIONS ---
+@metrics.timed("page_render_seconds", page="Dashboard")
 def page_dashboard():
+    import views
+    from analytics import PRESENT_MINUTES
     st.markdown("## 📊 Dashboard")
-    att = pd.read_csv(ATTENDANCE_DB)
-    courses = pd.read_csv(COURSES_DB)
+    summary = cached("dashboard_summary", lambda: views.dashboard_summary(get_store()))
+    totals, courses = summary["totals"], summary["recent"]
+    rates = cached(f"attendance_report_{PRESENT_MINUTES}",
+                   lambda: views.attendance_report(get_store(), get_attendance_matrix(), PRESENT_MINUTES))
     
-    total_p = att['user_email'].nunique() if not att.empty else 0
-    total_h = att['duration_minutes'].sum() / 60 if not att.empty else 0
+    total_p = int(totals['participants'])
+    total_h = totals['total_minutes'] / 60
     
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("Participants", total_p)
-    c2.metric("Active Sessions", len(courses))
+    c2.metric("Active Sessions", summary["courses"])
     c3.metric("Total Hours", f"{total_h:.1f}h")
-    c4.metric("Avg Attendance", "92%")
+    c4.metric("Avg Attendance", format_rate(rates["overall"]), help=f"Sessions attended (at least {PRESENT_MINUTES} min) out of sessions held since each participant joined the course")
 
     st.markdown("<br>### Recent Activity", unsafe_allow_html=True)
     if not courses.empty:
-        for idx, row in courses.tail(3).iterrows():
+        for idx, row in courses.iterrows():
             st.markdown(f"""
             <div class="session-row">
                 <div><div style="font-weight:600;">{row['course_name']}</div><div style="color:#94a3b8; font-size:0.85rem;">ID: {row['meeting_id']}</div></div>
@@ -298,118 +343,217 @@ def page_dashboard():
     else:
         st.info("No sessions yet.")
 
+@metrics.timed("page_render_seconds", page="Participants")
 def page_participants():
+    import views
     st.markdown("## 👥 Participants")
-    att = pd.read_csv(ATTENDANCE_DB)
-    if att.empty:
+    index = cached("participant_index", lambda: views.participant_index(get_store()))
+    if not len(index):
         st.info("No participants data. Sync a session first.")
         return
-
-    stats = att.groupby(['user_email', 'name']).agg({'duration_minutes': 'sum', 'meeting_id': 'nunique'}).reset_index()
     
     search = st.text_input("Search...", placeholder="Name or email")
-    if search:
-        stats = stats[stats['name'].str.contains(search, case=False) | stats['user_email'].str.contains(search, case=False)]
+    rows = index.search(search)
+    total = len(rows)
+    n_pages = max(1, -(-total // PARTICIPANTS_PER_PAGE))
+    page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key=f"participants_page_{search}") if n_pages > 1 else 1
+    stats = index.page(rows, page, PARTICIPANTS_PER_PAGE)
+    st.caption(f"{total} participants" + (f" · page {page} of {n_pages}" if n_pages > 1 else ""))
     
     st.markdown("<br>", unsafe_allow_html=True)
     cols = st.columns(3)
-    for idx, row in stats.iterrows():
+    for idx, row in enumerate(stats.to_dict('records')):
         col = cols[idx % 3]
         with col:
-            hours = row['duration_minutes'] / 60
+            hours = row['total_minutes'] / 60
             st.markdown(f"""
             <div class="participant-card">
                 <div class="p-name">{row['name']}</div>
                 <div class="p-email">{row['user_email']}</div>
                 <div class="p-stats">
-                    <div>Sessions: <b>{row['meeting_id']}</b></div>
+                    <div>Sessions: <b>{row['sessions']}</b></div>
                     <div>Hours: <b>{hours:.1f}h</b></div>
                 </div>
             </div>
             """, unsafe_allow_html=True)
 
+@metrics.timed("page_render_seconds", page="Sessions")
 def page_sessions():
+    import pandas as pd
+    import views
+    from sync import sync_meeting, sync_meetings
     st.markdown("## 📅 Sessions")
     with st.expander("➕ Add Session"):
         with st.form("new_sess"):
-            c1, c2 = st.columns(2)
+            c1, c2, c3 = st.columns([2, 2, 1])
             name = c1.text_input("Name")
             mid = c2.text_input("ID")
+            minutes = c3.number_input("Scheduled min", min_value=0, step=15, help="Optional. When set, only time inside the scheduled window counts.")
             if st.form_submit_button("Save"):
                 if name and mid:
-                    df = pd.read_csv(COURSES_DB)
-                    new = pd.DataFrame([{"meeting_id": mid, "course_name": name, "date_added": datetime.now().strftime("%Y-%m-%d")}])
-                    pd.concat([df, new]).to_csv(COURSES_DB, index=False)
+                    get_store().add_course(mid, name, datetime.now().strftime("%Y-%m-%d"), minutes or None)
                     st.rerun()
     
     st.markdown("<br>", unsafe_allow_html=True)
-    courses = pd.read_csv(COURSES_DB)
-    att = pd.read_csv(ATTENDANCE_DB)
+    courses = cached("sessions_summary", lambda: views.sessions_summary(get_store()))
+
+    if not courses.empty and st.button("⚡ Sync all sessions"):
+        client = st.session_state["zoom_client"]
+        meeting_ids = courses['meeting_id'].tolist()
+        names = dict(zip(courses['meeting_id'], courses['course_name']))
+        status = pd.DataFrame({"Session": [names[m] for m in meeting_ids], "Status": "⏳ Queued", "New instances": 0}, index=meeting_ids)
+        progress = st.progress(0.0, text=f"Syncing {len(meeting_ids)} sessions...")
+        table = st.empty()
+        table.dataframe(status, use_container_width=True)
+
+        synced, failed = {}, 0
+        known = get_store().known_instances()
+        for done, (mid, instances, err) in enumerate(sync_meetings(client, courses, known), start=1):
+            if err:
+                failed += 1
+                status.loc[mid, "Status"] = f"❌ {err}"
+            else:
+                synced[mid] = instances
+                status.loc[mid, ["Status", "New instances"]] = ["✅ Synced", len(instances)]
+            progress.progress(done / len(meeting_ids), text=f"Synced {done}/{len(meeting_ids)} sessions")
+            table.dataframe(status, use_container_width=True)
+
+        if synced:
+            get_store().ingest_instances(synced, datetime.now().isoformat(timespec="seconds"))
+        if failed:
+            st.warning(f"Synced {len(synced)} sessions, {failed} failed.")
+        else:
+            st.success(f"Synced {len(synced)} sessions!")
+            st.rerun()
     
-    for idx, row in courses.iterrows():
-        session_att = att[att['meeting_id'] == str(row['meeting_id'])]
-        p_count = session_att['user_email'].nunique()
-        
+    n_pages = max(1, -(-len(courses) // SESSIONS_PER_PAGE))
+    if n_pages > 1:
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1)
+        st.caption(f"Showing {(page-1)*SESSIONS_PER_PAGE + 1}–{min(page*SESSIONS_PER_PAGE, len(courses))} of {len(courses)} sessions")
+    else:
+        page = 1
+
+    for row in courses.iloc[(page-1)*SESSIONS_PER_PAGE:page*SESSIONS_PER_PAGE].itertuples(index=False):
         with st.container():
             c1, c2, c3, c4 = st.columns([3, 1.5, 1.5, 2])
-            c1.markdown(f"**{row['course_name']}**")
-            c1.caption(f"ID: {row['meeting_id']}")
-            c2.metric("Participants", p_count)
-            c3.metric("Hours", f"{(session_att['duration_minutes'].sum()/60):.1f}h")
+            c1.markdown(f"**{row.course_name}**")
+            c1.caption(f"ID: {row.meeting_id} · {row.instances} meetings synced")
+            c2.metric("Participants", row.participants)
+            c3.metric("Hours", f"{row.hours:.1f}h")
             
-            if c4.button("🔄 Sync", key=f"s_{idx}"):
+            if c4.button("🔄 Sync", key=f"s_{row.meeting_id}"):
                 with st.spinner("Syncing..."):
-                    token = st.session_state.get("access_token")
-                    data, err = fetch_meeting_participants(token, row['meeting_id'])
-                    if data:
-                        df_p = pd.DataFrame(data)
-                        if 'user_email' not in df_p.columns: df_p['user_email'] = ''
-                        
-                        att_clean = pd.read_csv(ATTENDANCE_DB)
-                        att_clean = att_clean[att_clean['meeting_id'] != str(row['meeting_id'])]
-                        
-                        new_d = df_p.groupby(['user_email', 'name'])['duration'].sum().reset_index()
-                        new_d['duration_minutes'] = (new_d['duration']/60).round(1)
-                        new_d['meeting_id'] = str(row['meeting_id'])
-                        new_d['sync_date'] = datetime.now().strftime("%Y-%m-%d")
-                        
-                        pd.concat([att_clean, new_d[['meeting_id','user_email','name','duration_minutes','sync_date']]]).to_csv(ATTENDANCE_DB, index=False)
-                        st.success(f"Synced {len(new_d)} people!")
-                        st.rerun()
-                    else:
+                    client = st.session_state["zoom_client"]
+                    try:
+                        known = get_store().known_instances([row.meeting_id]).get(row.meeting_id, frozenset())
+                        instances = sync_meeting(client, row, known)
+                    except ZoomAPIError as err:
                         st.error(f"Failed: {err}")
+                    else:
+                        get_store().ingest_instances({row.meeting_id: instances}, datetime.now().isoformat(timespec="seconds"))
+                        st.success(f"Synced {len(instances)} new meetings!")
+                        st.rerun()
             st.divider()
 
+@metrics.timed("page_render_seconds", page="Reports")
 def page_reports():
+    import plotly.express as px
+    import views
+    from analytics import PRESENT_MINUTES, AT_RISK_RATE, AT_RISK_MIN_SESSIONS, at_risk
+    import export
     st.markdown("## 📈 Reports")
-    att = pd.read_csv(ATTENDANCE_DB)
-    courses = pd.read_csv(COURSES_DB)
-    if att.empty:
+    stats = cached("meeting_hours", lambda: views.meeting_hours(get_store()))
+    if stats.empty:
         st.warning("No data.")
         return
-    
-    stats = att.groupby('meeting_id')['duration_minutes'].sum().reset_index()
-    courses['meeting_id'] = courses['meeting_id'].astype(str)
-    stats = stats.merge(courses, on='meeting_id', how='left')
-    stats['hours'] = (stats['duration_minutes']/60).round(1)
-    
-    fig = px.bar(stats, x='course_name', y='hours', title="Total Hours per Session")
-    fig.update_layout(plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)", font_color="white")
-    st.plotly_chart(fig, use_container_width=True)
+
+    c1, c2 = st.columns(2)
+    present = c1.number_input("Present after (min)", min_value=0, value=PRESENT_MINUTES, step=1,
+                              help="Minutes in a session before a participant counts as present.")
+    threshold = c2.slider("At risk below", min_value=0, max_value=100, value=int(AT_RISK_RATE * 100), format="%d%%") / 100
+    rates = cached(f"attendance_report_{present}", lambda: views.attendance_report(get_store(), get_attendance_matrix(), present))
+    risky = at_risk(rates["students"], threshold)
+
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Attendance rate", format_rate(rates["overall"]))
+    m2.metric("Students", len(rates["students"]))
+    m3.metric("At risk", len(risky))
+
+    layout = dict(plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)", font_color="white")
+    t_courses, t_weeks, t_retention, t_risk, t_hours, t_export = st.tabs(
+        ["Courses", "Weekly", "Retention", "At-risk students", "Hours", "Export"])
+    with t_courses:
+        fig = px.bar(rates["courses"], x='course_name', y='rate', hover_data=['students', 'sessions'], title="Attendance Rate per Session")
+        fig.update_layout(yaxis_tickformat=".0%", **layout)
+        st.plotly_chart(fig, use_container_width=True)
+    with t_weeks:
+        fig = px.line(rates["weeks"], x='week', y='rate', markers=True, hover_data=['sessions'], title="Attendance Rate per Week")
+        fig.update_layout(yaxis_tickformat=".0%", **layout)
+        st.plotly_chart(fig, use_container_width=True)
+    with t_retention:
+        # Keyed by meeting ID: course names need not be unique
+        titles = {m: f"{n} ({m})" for m, n in zip(rates["courses"]['meeting_id'], rates["courses"]['course_name'])}
+        largest = rates["courses"].nlargest(5, 'students')['meeting_id'].tolist()
+        picked = st.multiselect("Sessions", list(titles), default=largest, format_func=titles.get)
+        retention = rates["retention"][rates["retention"]['meeting_id'].isin(picked)]
+        retention = retention.assign(course=retention['meeting_id'].map(titles))
+        fig = px.line(retention, x='session', y='retention', color='course', markers=True,
+                      title="Share of Students Still Attending", labels={'session': "Meeting #", 'course': "Session"})
+        fig.update_layout(yaxis_tickformat=".0%", **layout)
+        st.plotly_chart(fig, use_container_width=True)
+    with t_risk:
+        st.caption(f"{len(risky)} students below {threshold:.0%} after at least {AT_RISK_MIN_SESSIONS} expected meetings"
+                   + (f" · showing the lowest {AT_RISK_ROWS}" if len(risky) > AT_RISK_ROWS else ""))
+        st.dataframe(risky.head(AT_RISK_ROWS)[['name', 'user_email', 'courses', 'attended', 'expected', 'rate']],
+                     column_config={"rate": st.column_config.ProgressColumn("Rate", format="percent", min_value=0, max_value=1)},
+                     hide_index=True, use_container_width=True)
+    with t_hours:
+        fig = px.bar(stats, x='course_name', y='hours', title="Total Hours per Session")
+        fig.update_layout(**layout)
+        st.plotly_chart(fig, use_container_width=True)
+    with t_export:
+        # Keyed by meeting ID: course names need not be unique
+        names = dict(zip(stats['meeting_id'], stats['course_name'].fillna(stats['meeting_id'])))
+        c1, c2 = st.columns(2)
+        picked = c1.multiselect("Sessions", list(names), format_func=lambda m: f"{names[m]} ({m})", placeholder="All sessions")
+        person = c1.text_input("Participant", placeholder="Name or email contains...")
+        dates = c2.date_input("Meetings between", value=(), help="Rows imported before per-meeting sync have no date and are left out.")
+        fmt = c2.radio("Format", export.FORMATS, horizontal=True, format_func=str.upper)
+        compression = c2.selectbox("Compression", export.COMPRESSIONS[fmt])
+        filters = {
+            "meeting_ids": picked,
+            "start": dates[0] if len(dates) > 0 else None,
+            "end": dates[1] if len(dates) > 1 else None,
+            "participant": person,
+        }
+        store = get_store()
+        # Generated in chunks when clicked, on Streamlit's download thread rather than in this rerun
+        st.download_button("⬇️ Export attendance", lambda: export.export_file(store, fmt, compression, **filters),
+                           file_name=export.file_name(fmt, compression), mime=export.MIME_TYPES[export.extension(fmt, compression)],
+                           on_click="ignore", use_container_width=True)
 
 # --- 5. MAIN EXECUTION ---
 def main():
     # 1. Check for Auth Callback
     if "code" in st.query_params:
         code = st.query_params["code"]
-        token_data = exchange_code_for_token(code)
-        if "access_token" in token_data:
-            st.session_state["access_token"] = token_data["access_token"]
+        client = new_zoom_client()
+        try:
+            client.exchange_code(code)
+        except ZoomAPIError as err:
+            st.error(f"Login failed: {err}")
+        else:
+            st.session_state["zoom_client"] = client
+            if ADMIN_EMAILS:
+                try:
+                    st.session_state["user_email"] = client.me().get("email", "").lower()
+                except ZoomAPIError:
+                    pass
             st.query_params.clear()
             st.rerun()
 
     # 2. Render App based on Auth State
-    if "access_token" not in st.session_state:
+    if "zoom_client" not in st.session_state:
         # Remove default padding for the Landing Page to look like a real site
         st.markdown("""
             <style>
@@ -0,0 +1,242 @@
+"""Repeatable performance benchmarks against fake_zoom.py and a throwaway store.
+
+Times four things:
+  * startup - cold import and first render of the logged-out landing page, in fresh interpreters
+  * sync    - fetching and aggregating meetings from the fake Zoom API (sync.sync_meetings)
+  * store   - ingesting / re-syncing one meeting instance into stores of growing history
+  * pages   - the data preparation behind each page (views.PAGE_DATA), uncached
+
+    python bench.py
+    python bench.py --sizes 10000,100000,1000000 --repeat 5 --json bench_output.txt
+
+Data is generated from fixed seeds and each timing is the median of --repeat runs, so numbers
+from different commits on the same machine are comparable.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import views
+import export
+from analytics import AttendanceMatrix, attendance_rates
+from fake_zoom import FakeZoom
+from store import AttendanceStore
+from sync import sync_meetings
+from zoom_client import RateLimiter, ZoomClient
+
+INSTANCE_ROWS = 200
+INSTANCES_PER_COURSE = 12
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+HEAVY_MODULES = ("pandas", "numpy", "plotly.express", "store")
+
+# Runs in a fresh interpreter: the landing page as a logged-out visitor sees it
+STARTUP_PROBE = """
+import json, os, sys, time
+t0 = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+at.secrets["zoom"] = {"client_id": "bench", "client_secret": "bench", "redirect_uri": "http://localhost"}
+at.run()
+t2 = time.perf_counter()
+at.run()
+t3 = time.perf_counter()
+print(json.dumps({"streamlit_import_s": t1 - t0, "first_paint_s": t2 - t1, "rerun_s": t3 - t2,
+                  "exceptions": len(at.exception), "store_created": os.path.exists("zoom_attendance.db"),
+                  "heavy": [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+
+def timed(fn, repeat):
+    """Median and min wall time of `repeat` calls to fn(i)."""
+    times = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn(i)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), min(times)
+
+
+def instance_rows(rng, people, n):
+    person = rng.integers(0, people, n)
+    person = np.unique(person)
+    return pd.DataFrame({
+        "user_email": [f"student{p}@example.edu" for p in person],
+        "name": [f"Student {p}" for p in person],
+        "duration_minutes": rng.integers(1, 120, len(person)).astype(float),
+        "sync_date": "2026-01-01",
+    })
+
+
+def build_store(path, history_rows, seed=0):
+    """A store holding roughly `history_rows` attendance rows spread over courses and weekly instances."""
+    rng = np.random.default_rng(seed)
+    store = AttendanceStore(path)
+    n_instances = max(1, history_rows // INSTANCE_ROWS)
+    n_courses = max(1, n_instances // INSTANCES_PER_COURSE)
+    people = max(INSTANCE_ROWS, history_rows // 20)
+    for c in range(n_courses):
+        store.add_course(f"9{c:09d}", f"Course {c}", "2026-01-01")
+
+    batch = {}
+    for i in range(n_instances):
+        course = f"9{i % n_courses:09d}"
+        start = f"2026-01-{1 + (i // n_courses) % 28:02d}T{(i // n_courses // 28) % 24:02d}:00:00Z"
+        batch.setdefault(course, []).append((f"bench-{i}", start, instance_rows(rng, people, INSTANCE_ROWS)))
+        if len(batch) >= 200 or i == n_instances - 1:
+            store.ingest_instances(batch)
+            batch = {}
+    return store, people
+
+
+def bench_startup(args):
+    """Median first paint of the landing page over --repeat fresh interpreters, started in an empty directory."""
+    runs = []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as cwd:
+            out = subprocess.run([sys.executable, "-c", STARTUP_PROBE, APP, *HEAVY_MODULES], cwd=cwd,
+                                 capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    if any(r["exceptions"] for r in runs):
+        raise RuntimeError("landing page raised an exception")
+    paint = [r["first_paint_s"] for r in runs]
+    return [{
+        "bench": "startup.landing", "median_s": statistics.median(paint), "min_s": min(paint),
+        "streamlit_import_s": statistics.median(r["streamlit_import_s"] for r in runs),
+        "rerun_s": statistics.median(r["rerun_s"] for r in runs),
+        "heavy_imports": ",".join(runs[0]["heavy"]) or "none", "store_created": runs[0]["store_created"],
+    }]
+
+
+def bench_sync(args):
+    fake = FakeZoom(records=args.records, instances=args.instances, latency=args.latency_ms / 1000, seed=args.seed)
+    fake.start()
+    try:
+        client = ZoomClient("bench", "bench", "http://localhost", limiter=RateLimiter(args.rate, 10**9), **fake.endpoints())
+        client.exchange_code("fake-code")
+        courses = pd.DataFrame({"meeting_id": [f"8{i:09d}" for i in range(args.meetings)],
+                                "scheduled_minutes": None, "synced_through": None})
+
+        def run(_):
+            for _mid, _instances, err in sync_meetings(client, courses, {}, workers=args.workers):
+                if err:
+                    raise RuntimeError(err)
+
+        before = fake.stats["requests"]
+        median, best = timed(run, args.repeat)
+        calls = (fake.stats["requests"] - before) / args.repeat
+        records = args.meetings * args.instances * args.records
+        return [{
+            "bench": "sync", "meetings": args.meetings, "instances": args.instances, "records": records,
+            "api_calls": calls, "median_s": median, "min_s": best,
+            "records_per_s": records / median, "instances_per_s": args.meetings * args.instances / median,
+        }]
+    finally:
+        fake.stop()
+
+
+def bench_store_and_pages(args, size, workdir):
+    path = os.path.join(workdir, f"bench_{size}.db")
+    store, people = build_store(path, size, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    results = []
+
+    new_rows = [instance_rows(rng, people, INSTANCE_ROWS * 5) for _ in range(args.repeat)]
+    median, best = timed(lambda i: store.ingest_instances({"9000000000": [(f"new-{i}", "2027-01-01T10:00:00Z", new_rows[i])]}), args.repeat)
+    results.append({"bench": "store.ingest_new_instance", "history_rows": size, "rows": len(new_rows[0]), "median_s": median, "min_s": best})
+
+    median, best = timed(lambda i: store.ingest_instances({"9000000000": [("new-0", "2027-01-01T10:00:00Z", new_rows[-1 - i])]}), args.repeat)
+    results.append({"bench": "store.resync_instance", "history_rows": size, "rows": len(new_rows[0]), "median_s": median, "min_s": best})
+
+    for page, build in views.PAGE_DATA.items():
+        median, best = timed(lambda _: build(store), args.repeat)
+        results.append({"bench": f"page.{page}", "history_rows": size, "median_s": median, "min_s": best})
+
+    median, best = timed(lambda _: AttendanceMatrix().refresh(store), args.repeat)
+    results.append({"bench": "analytics.build_matrix", "history_rows": size, "median_s": median, "min_s": best})
+    matrix = AttendanceMatrix()
+    matrix.refresh(store)
+    refresh_times = []
+    for i in range(args.repeat):
+        store.ingest_instances({"9000000000": [(f"analytics-{i}", "2027-02-01T10:00:00Z", new_rows[i])]})
+        t0 = time.perf_counter()
+        matrix.refresh(store)
+        refresh_times.append(time.perf_counter() - t0)
+    results.append({"bench": "analytics.refresh_matrix", "history_rows": size, "cells": len(matrix),
+                    "median_s": statistics.median(refresh_times), "min_s": min(refresh_times)})
+    median, best = timed(lambda _: attendance_rates(matrix), args.repeat)
+    results.append({"bench": "page.Reports.attendance", "history_rows": size, "median_s": median, "min_s": best})
+
+    for fmt, compression in [("csv", "gzip"), ("parquet", "zstd")]:
+        if fmt not in export.FORMATS:
+            continue
+
+        def run(_):
+            with open(os.devnull, "wb") as sink:
+                return export.write_export(store, sink, fmt, compression)
+        median, best = timed(run, args.repeat)
+        results.append({"bench": f"export.{export.extension(fmt, compression)}", "history_rows": size, "median_s": median, "min_s": best})
+
+    index = views.participant_index(store)
+    queries = ["student 1", "stu", "example.edu", "zz"]
+    median, best = timed(lambda i: index.search(queries[i % len(queries)]), args.repeat * len(queries))
+    results.append({"bench": "page.Participants.search", "history_rows": size, "participants": len(index), "median_s": median, "min_s": best})
+
+    store.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="attendance history sizes (rows) for store/page benches")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--meetings", type=int, default=20, help="meetings per sync run")
+    parser.add_argument("--instances", type=int, default=2, help="instances per meeting on the fake server")
+    parser.add_argument("--records", type=int, default=3000, help="join records per instance on the fake server")
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=1000, help="client-side API calls per second")
+    parser.add_argument("--only", choices=["startup", "sync", "store"], help="run only one group")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="append results as JSON lines to this file")
+    args = parser.parse_args()
+
+    env = {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+           "sqlite": sqlite3.sqlite_version, "machine": platform.machine()}
+    print(" ".join(f"{k}={v}" for k, v in env.items()))
+
+    results = []
+    if args.only in (None, "startup"):
+        results += bench_startup(args)
+    if args.only in (None, "sync"):
+        results += bench_sync(args)
+    if args.only in (None, "store"):
+        with tempfile.TemporaryDirectory() as workdir:
+            for size in (int(s) for s in args.sizes.split(",")):
+                results += bench_store_and_pages(args, size, workdir)
+
+    for r in results:
+        extra = " ".join(f"{k}={v:.3f}" if k.endswith("_s") else f"{k}={v:.0f}" if isinstance(v, float) else f"{k}={v}"
+                         for k, v in r.items() if k not in ("bench", "median_s", "min_s"))
+        print(f"{r['bench']:<28} median {r['median_s']*1000:10.2f} ms   min {r['min_s']*1000:10.2f} ms   {extra}")
+
+    if args.json:
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with open(args.json, "a") as f:
+            for r in results:
+                f.write(json.dumps({"time": stamp, **env, **r}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Chunked attendance export, read straight from the store.
+
+Rows are fetched `chunk_rows` at a time and written out as they arrive, so the working memory of
+writing an export is one chunk whatever the filter matches. The finished file is then handed to
+Streamlit as bytes, which keeps it in memory until it is downloaded. Parquet needs pyarrow; without
+it only CSV is offered.
+"""
+import gzip
+import io
+import importlib.util
+import tempfile
+from datetime import timedelta
+
+import pandas as pd
+
+import metrics
+from store import QUERY_CHUNK_ROWS, normalize_meeting_id
+
+EXPORT_COLUMNS = ["course_name", "meeting_id", "instance_uuid", "start_time", "user_email", "name",
+                  "duration_minutes", "sync_date"]
+
+# Format -> compressions it supports (the first is the default)
+COMPRESSIONS = {"csv": ["none", "gzip"], "parquet": ["zstd", "snappy", "gzip", "none"]}
+FORMATS = [f for f in COMPRESSIONS if f != "parquet" or importlib.util.find_spec("pyarrow")]
+MIME_TYPES = {"csv": "text/csv", "csv.gz": "application/gzip", "parquet": "application/vnd.apache.parquet"}
+
+# zlib's default level; 9 is three times slower for a few percent smaller files
+GZIP_LEVEL = 6
+# Exports held in memory up to this size before spilling to a temporary file
+SPOOL_BYTES = 16 * 1024 * 1024
+
+
+def escape_like(text):
+    """`text` as a literal inside a LIKE pattern (with ESCAPE '\\')."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def export_query(meeting_ids=None, start=None, end=None, participant=None):
+    """SQL and parameters for the attendance rows matching the filters.
+
+    `start`/`end` are dates (inclusive) on the meeting's start time, so rows imported before
+    per-instance sync, which have no start time, only appear without a date filter. `participant`
+    matches a substring of the name or email, case-insensitively.
+    """
+    where, params = [], []
+    if meeting_ids:
+        ids = [normalize_meeting_id(m) for m in meeting_ids]
+        where.append(f"a.meeting_id IN ({', '.join('?' * len(ids))})")
+        params += ids
+    if start:
+        where.append("i.start_time >= ?")
+        params.append(start.isoformat())
+    if end:
+        where.append("i.start_time < ?")
+        params.append((end + timedelta(days=1)).isoformat())
+    if participant and participant.strip():
+        where.append("(a.user_email LIKE ? ESCAPE '\\' OR a.name LIKE ? ESCAPE '\\')")
+        params += [f"%{escape_like(participant.strip())}%"] * 2
+    # Attendance primary-key order, so SQLite streams rows without sorting the result
+    sql = ("SELECT c.course_name, a.meeting_id, a.instance_uuid, i.start_time, a.user_email, a.name, a.duration_minutes, a.sync_date "
+           "FROM attendance a "
+           "LEFT JOIN meeting_instances i ON i.meeting_id = a.meeting_id AND i.uuid = a.instance_uuid "
+           "LEFT JOIN courses c ON c.meeting_id = a.meeting_id"
+           + (" WHERE " + " AND ".join(where) if where else "")
+           + " ORDER BY a.meeting_id, a.instance_uuid")
+    return sql, tuple(params)
+
+
+def iter_export(store, chunk_rows=QUERY_CHUNK_ROWS, parse_dates=True, **filters):
+    """Frames of EXPORT_COLUMNS, `chunk_rows` rows at a time. Without `parse_dates` dates stay ISO strings."""
+    sql, params = export_query(**filters)
+    for chunk in store.iter_query(sql, params, chunk_rows, parse_dates):
+        if parse_dates:
+            chunk["start_time"] = pd.to_datetime(chunk["start_time"], utc=True, errors="coerce", format="ISO8601")
+        yield chunk[EXPORT_COLUMNS]
+
+
+def write_csv(chunks, out, compression="none"):
+    stream = gzip.GzipFile(fileobj=out, mode="wb", compresslevel=GZIP_LEVEL) if compression == "gzip" else out
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    rows = 0
+    try:
+        for chunk in chunks:
+            chunk.to_csv(text, header=not rows, index=False)
+            rows += len(chunk)
+        if not rows:
+            text.write(",".join(EXPORT_COLUMNS) + "\n")
+    finally:
+        text.flush()
+        text.detach()
+        if stream is not out:
+            stream.close()
+    return rows
+
+
+def write_parquet(chunks, out, compression="zstd"):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("course_name", pa.string()), ("meeting_id", pa.string()), ("instance_uuid", pa.string()),
+        ("start_time", pa.timestamp("us", tz="UTC")), ("user_email", pa.string()), ("name", pa.string()),
+        ("duration_minutes", pa.float32()), ("sync_date", pa.timestamp("us")),
+    ])
+    rows = 0
+    # One row group per chunk
+    with pq.ParquetWriter(out, schema, compression=compression) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    return rows
+
+
+def write_export(store, out, fmt="csv", compression="none", chunk_rows=QUERY_CHUNK_ROWS, **filters):
+    """Write the filtered attendance rows to the binary file `out`; returns the number of rows."""
+    # CSV writes the ISO strings as stored; formatting parsed datetimes back costs more than the rest of the export
+    chunks = iter_export(store, chunk_rows, parse_dates=fmt == "parquet", **filters)
+    with metrics.timer("export_seconds", format=fmt):
+        rows = write_parquet(chunks, out, compression) if fmt == "parquet" else write_csv(chunks, out, compression)
+    metrics.inc("export_rows_total", rows, format=fmt)
+    return rows
+
+
+def export_file(store, fmt="csv", compression="none", chunk_rows=QUERY_CHUNK_ROWS, **filters):
+    """The export as bytes, for st.download_button.
+
+    Written to a temporary file (in memory while small, on disk beyond SPOOL_BYTES) and read back
+    once, so the file is held in memory only once while it is built.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as out:
+        write_export(store, out, fmt, compression, chunk_rows, **filters)
+        out.seek(0)
+        return out.read()
+
+
+def file_name(fmt, compression, stem="attendance"):
+    return f"{stem}.{extension(fmt, compression)}"
+
+
+def extension(fmt, compression):
+    return "csv.gz" if fmt == "csv" and compression == "gzip" else fmt
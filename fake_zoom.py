@@ -0,0 +1,213 @@
+"""Local stand-in for the parts of the Zoom API this app uses.
+
+Serves the OAuth authorize/token endpoints, users/me, and the paginated past-meeting instances
+and participants endpoints with deterministic synthetic data, optional latency and 429s.
+
+    python fake_zoom.py --port 8765 --records 5000 --instances 10 --latency-ms 50
+
+Then point the app at it in .streamlit/secrets.toml:
+
+    [zoom]
+    authorize_url = "http://127.0.0.1:8765/oauth/authorize"
+    token_url = "http://127.0.0.1:8765/oauth/token"
+    api_base = "http://127.0.0.1:8765/v2"
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlencode, urlparse
+
+FIRST_INSTANCE = datetime(2026, 1, 5, 10, 0, tzinfo=timezone.utc)
+MAX_PAGE_SIZE = 300
+
+
+def iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FakeZoom:
+    """Synthetic Zoom API. Every meeting ID exists and has `instances` weekly instances of `records` join records."""
+    def __init__(self, records=1000, people=None, instances=4, latency=0.0, error_rate=0.0,
+                 rate_limit=None, token_ttl=3600, seed=0):
+        self.records = records
+        self.people = people or max(1, records // 2)
+        self.instances = instances
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.token_ttl = token_ttl
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window = (0, 0)  # (second, requests in that second) for rate_limit
+        self.stats = {"requests": 0, "throttled": 0, "tokens": 0}
+        self.server = None
+
+    # --- lifecycle ---
+    def start(self, host="127.0.0.1", port=0):
+        """Serve in a daemon thread; returns the base URL."""
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def endpoints(self):
+        """Keyword arguments for ZoomClient (and the [zoom] secrets) that target this server."""
+        return {
+            "authorize_url": f"{self.base_url}/oauth/authorize",
+            "token_url": f"{self.base_url}/oauth/token",
+            "api_base": f"{self.base_url}/v2",
+        }
+
+    # --- synthetic data ---
+    def instance_list(self, meeting_id):
+        # Odd instances get a leading "/" so clients have to double-encode them, as with real UUIDs
+        return [{"uuid": f"{'/' if k % 2 else ''}{meeting_id}/{k}==", "start_time": iso(FIRST_INSTANCE + timedelta(weeks=k))}
+                for k in range(self.instances)]
+
+    def participants_page(self, meeting_or_uuid, page, page_size):
+        meeting_id, _, k = meeting_or_uuid.lstrip("/").partition("/")
+        k = int(k.rstrip("=") or self.instances - 1)
+        start = FIRST_INSTANCE + timedelta(weeks=k)
+        rng = random.Random(f"{self.seed}:{meeting_id}:{k}:{page}")
+        first = page * page_size
+        parts = []
+        for i in range(first, min(first + page_size, self.records)):
+            person = rng.randrange(self.people)
+            join = start + timedelta(seconds=rng.randint(-300, 3000))
+            duration = rng.randint(60, 3600)
+            parts.append({
+                "id": f"p{person}",
+                "name": f"Student {person}",
+                "user_email": f"student{person}@example.edu" if person % 10 else "",
+                "join_time": iso(join),
+                "leave_time": iso(join + timedelta(seconds=duration)),
+                "duration": duration,
+            })
+        more = first + page_size < self.records
+        return {"page_size": page_size, "total_records": self.records, "participants": parts,
+                "next_page_token": str(page + 1) if more else ""}
+
+    # --- throttling ---
+    def throttled(self):
+        with self.lock:
+            self.stats["requests"] += 1
+            now = int(time.monotonic())
+            second, count = self.window
+            self.window = (now, count + 1) if second == now else (now, 1)
+            over = self.rate_limit is not None and self.window[1] > self.rate_limit
+            if over or (self.error_rate and self.rng.random() < self.error_rate):
+                self.stats["throttled"] += 1
+                return True
+        return False
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, status, body, headers=()):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in headers:
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if url.path != "/oauth/token":
+                    return self.send_json(404, {"message": "Not found"})
+                with fake.lock:
+                    fake.stats["tokens"] += 1
+                    n = fake.stats["tokens"]
+                self.send_json(200, {"access_token": f"fake-access-{n}", "token_type": "bearer",
+                                     "refresh_token": f"fake-refresh-{n}", "expires_in": fake.token_ttl})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == "/oauth/authorize":
+                    target = query.get("redirect_uri", ["/"])[0]
+                    self.send_response(302)
+                    self.send_header("Location", f"{target}?{urlencode({'code': 'fake-code'})}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                if not self.headers.get("Authorization", "").startswith("Bearer fake-access-"):
+                    return self.send_json(401, {"code": 124, "message": "Invalid access token."})
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if fake.throttled():
+                    return self.send_json(429, {"code": 429, "message": "You have reached the maximum per-second rate limit."},
+                                          headers=[("Retry-After", "1")])
+
+                if url.path == "/v2/users/me":
+                    return self.send_json(200, {"id": "fake-user", "email": "admin@example.edu", "first_name": "Fake", "last_name": "Admin"})
+                parts = url.path.split("/")
+                if len(parts) != 5 or parts[1:3] != ["v2", "past_meetings"]:
+                    return self.send_json(404, {"message": "Not found"})
+                meeting_id = parts[3]
+                while "%" in meeting_id:
+                    meeting_id = unquote(meeting_id)
+                if parts[4] == "instances":
+                    return self.send_json(200, {"meetings": fake.instance_list(meeting_id)})
+                if parts[4] == "participants":
+                    page_size = min(int(query.get("page_size", [30])[0]), MAX_PAGE_SIZE)
+                    page = int(query.get("next_page_token", ["0"])[0] or 0)
+                    return self.send_json(200, fake.participants_page(meeting_id, page, page_size))
+                self.send_json(404, {"message": "Not found"})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--records", type=int, default=1000, help="join records per meeting instance")
+    parser.add_argument("--people", type=int, help="distinct participants (default: records / 2)")
+    parser.add_argument("--instances", type=int, default=4, help="ended instances per meeting")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of API calls answered with 429")
+    parser.add_argument("--rate-limit", type=int, help="API calls per second before answering 429")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fake = FakeZoom(records=args.records, people=args.people, instances=args.instances, latency=args.latency_ms / 1000,
+                    error_rate=args.error_rate, rate_limit=args.rate_limit, seed=args.seed)
+    fake.start(args.host, args.port)
+    print(f"Fake Zoom API on {fake.base_url}")
+    for key, value in fake.endpoints().items():
+        print(f'{key} = "{value}"')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import metrics
+
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def size_of(value):
+    """Bytes charged to a cache entry: deep size of frames, `nbytes` of objects that report it (indexes, arrays),
+    and the sum of the items of dicts, lists and tuples of those."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum()) if isinstance(value, pd.DataFrame) else int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(size_of(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(size_of(v) for v in value)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+class FrameCache:
+    """Process-wide LRU cache for frames derived from the store.
+
+    Every entry remembers the store version it was built from; a lookup with a newer version
+    rebuilds it. The store calls `invalidate` after each write so stale frames are dropped at once
+    instead of waiting to be evicted. Total size is bounded by `max_bytes`.
+    """
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (version, value, nbytes)
+        self.nbytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, version, build):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(key)
+                metrics.inc("frame_cache_lookups_total", result="hit")
+                return entry[1]
+        metrics.inc("frame_cache_lookups_total", result="miss")
+
+        with metrics.timer("frame_cache_build_seconds", key=key):
+            value = build()
+        nbytes = size_of(value)
+        with self.lock:
+            self._drop(key)
+            if nbytes <= self.max_bytes:
+                self.entries[key] = (version, value, nbytes)
+                self.nbytes += nbytes
+                while self.nbytes > self.max_bytes:
+                    self._drop(next(iter(self.entries)))
+            metrics.set_gauge("frame_cache_bytes", self.nbytes)
+        return value
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[2]
+
+    def invalidate(self, version=None):
+        """Drop every entry built before `version` (or everything when no version is given)."""
+        with self.lock:
+            for key in [k for k, (v, _, _) in self.entries.items() if version is None or v < version]:
+                self._drop(key)
@@ -0,0 +1,147 @@
+"""In-process counters, gauges and latency histograms for the hot paths.
+
+The registry is module-level, so it lives as long as the server process and is shared by every
+session. Export with `prometheus()` (text exposition format) or `json_lines()`.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+PREFIX = "zoomattendance_"
+
+# Upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        while i < len(BUCKETS) and value > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (inf when it is past the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip((*BUCKETS, float("inf")), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+def series_key(name, labels):
+    """(name, sorted labels) with every label value as a string, so series always sort and export alike."""
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}    # (name, labels) -> float
+        self.gauges = {}      # (name, labels) -> float
+        self.histograms = {}  # (name, labels) -> Histogram
+
+    def inc(self, name, value=1, **labels):
+        key = series_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[series_key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = series_key(name, labels)
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name, **labels):
+        """Decorator form of `timer`."""
+        def decorate(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    # --- export ---
+    def snapshot(self):
+        """One dict per series, for tables and JSON export."""
+        with self.lock:
+            rows = [{"type": "counter", "name": n, "labels": dict(l), "value": v} for (n, l), v in self.counters.items()]
+            rows += [{"type": "gauge", "name": n, "labels": dict(l), "value": v} for (n, l), v in self.gauges.items()]
+            rows += [{"type": "histogram", "name": n, "labels": dict(l), "count": h.count, "sum": h.sum,
+                      "p50": h.quantile(0.5), "p95": h.quantile(0.95), "p99": h.quantile(0.99)}
+                     for (n, l), h in self.histograms.items()]
+        return sorted(rows, key=lambda r: (r["name"], sorted(r["labels"].items())))
+
+    def json_lines(self):
+        stamp = time.time()
+        return "".join(json.dumps({"ts": stamp, **row}) + "\n" for row in self.snapshot())
+
+    def prometheus(self):
+        def fmt(labels, extra=()):
+            pairs = [*labels, *extra]
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self.lock:
+            typed = set()
+            for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+                for (name, labels), value in sorted(series.items()):
+                    if name not in typed:
+                        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+                        typed.add(name)
+                    lines.append(f"{PREFIX}{name}{fmt(labels)} {value}")
+            for (name, labels), hist in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {PREFIX}{name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, n in zip((*BUCKETS, "+Inf"), hist.counts):
+                    cumulative += n
+                    lines.append(f"{PREFIX}{name}_bucket{fmt(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{PREFIX}{name}_sum{fmt(labels)} {hist.sum}")
+                lines.append(f"{PREFIX}{name}_count{fmt(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+set_gauge = REGISTRY.set
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+timed = REGISTRY.timed
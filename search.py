@@ -0,0 +1,61 @@
+import sys
+from collections import defaultdict
+
+import numpy as np
+
+
+class ParticipantIndex:
+    """Substring search over participant names and emails.
+
+    Queries of three or more characters use a trigram index: the candidate rows are the
+    intersection of the posting lists of the query's trigrams, then each candidate is checked
+    with a plain substring test. Shorter queries have no trigram to look up, so they scan the
+    lower-cased text directly. Build it once per data version.
+    """
+    def __init__(self, frame, columns=("name", "user_email")):
+        self.frame = frame.reset_index(drop=True)
+        self.text = ["\n".join(str(v) for v in values).lower()
+                     for values in zip(*(self.frame[c].fillna("") for c in columns))]
+
+        postings = defaultdict(list)
+        for row, text in enumerate(self.text):
+            for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                postings[gram].append(row)
+        self.postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held: the frame, the lower-cased text and the posting lists."""
+        frame = int(self.frame.memory_usage(deep=True).sum())
+        text = sys.getsizeof(self.text) + sum(sys.getsizeof(t) for t in self.text)
+        postings = sys.getsizeof(self.postings) + sum(sys.getsizeof(g) + rows.nbytes for g, rows in self.postings.items())
+        return frame + text + postings
+
+    def search(self, query):
+        """Row positions (ascending) whose name or email contains `query`, case-insensitively."""
+        query = query.strip().lower()
+        if not query:
+            return np.arange(len(self.frame))
+        if len(query) < 3:
+            return np.array([r for r, text in enumerate(self.text) if query in text], dtype=np.int32)
+
+        grams = {query[i:i + 3] for i in range(len(query) - 2)}
+        lists = sorted((self.postings.get(g) for g in grams), key=lambda rows: 0 if rows is None else len(rows))
+        if lists[0] is None:
+            return np.array([], dtype=np.int32)
+        rows = lists[0]
+        for other in lists[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+            if not len(rows):
+                break
+        # A three-character query is its own trigram; longer ones can share every trigram with a non-match
+        if len(query) > 3:
+            rows = np.array([r for r in rows if query in self.text[r]], dtype=np.int32)
+        return rows
+
+    def page(self, rows, page, per_page):
+        """Frame rows of the requested page of `rows` (a `search` result, computed once per query)."""
+        return self.frame.iloc[rows[(page - 1) * per_page:page * per_page]]
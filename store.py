@@ -0,0 +1,510 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+import metrics
+
+STORE_DB = 'zoom_attendance.db'
+
+# Seconds a connection waits for another writer (another process) before "database is locked"
+BUSY_TIMEOUT = 30
+# Seconds between background passes that fold the ingest log into the attendance tables
+COMPACT_INTERVAL = 5
+# Rows per frame yielded by iter_query
+QUERY_CHUNK_ROWS = 50_000
+
+COURSE_COLUMNS = ["meeting_id", "course_name", "date_added", "scheduled_minutes", "synced_through"]
+ATTENDANCE_COLUMNS = ["meeting_id", "instance_uuid", "user_email", "name", "duration_minutes", "sync_date"]
+LEGACY_ATTENDANCE_COLUMNS = ["meeting_id", "user_email", "name", "duration_minutes", "sync_date"]
+
+# In-memory dtypes for frames read from the store, by column name: 32-bit measures and counts,
+# parsed dates, and meeting IDs as strings whatever SQLite hands back.
+COLUMN_DTYPES = {
+    "meeting_id": str,
+    "duration_minutes": "float32", "total_minutes": "float32", "scheduled_minutes": "float32",
+    "participants": "int32", "instances": "int32", "sessions": "int32",
+}
+DATE_COLUMNS = ["date_added", "sync_date"]
+
+def normalize_meeting_id(meeting_id):
+    """Meeting IDs are stored as digit strings without the spaces Zoom shows them with."""
+    return str(meeting_id).replace(" ", "").strip()
+
+
+def typed(frame, parse_dates=True):
+    """Apply the in-memory schema to the columns of `frame` that it covers."""
+    dtypes = {c: t for c, t in COLUMN_DTYPES.items() if c in frame.columns}
+    frame = frame.astype(dtypes)
+    for col in DATE_COLUMNS if parse_dates else ():
+        if col in frame.columns:
+            frame[col] = pd.to_datetime(frame[col], errors="coerce", format="ISO8601")
+    return frame
+
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+MIGRATIONS = [
+    """
+    CREATE TABLE courses (
+        meeting_id TEXT PRIMARY KEY,
+        course_name TEXT NOT NULL,
+        date_added TEXT
+    );
+    CREATE TABLE attendance (
+        meeting_id TEXT NOT NULL,
+        user_email TEXT NOT NULL DEFAULT '',
+        name TEXT NOT NULL DEFAULT '',
+        duration_minutes REAL NOT NULL DEFAULT 0,
+        sync_date TEXT,
+        PRIMARY KEY (meeting_id, user_email, name)
+    );
+    CREATE INDEX idx_attendance_email ON attendance(user_email);
+    """,
+    """
+    CREATE TABLE meeting_rollup (
+        meeting_id TEXT PRIMARY KEY,
+        participants INTEGER NOT NULL,
+        total_minutes REAL NOT NULL
+    );
+    CREATE TABLE participant_rollup (
+        user_email TEXT NOT NULL,
+        name TEXT NOT NULL,
+        total_minutes REAL NOT NULL,
+        sessions INTEGER NOT NULL,
+        PRIMARY KEY (user_email, name)
+    );
+    CREATE TABLE totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        participants INTEGER NOT NULL,
+        total_minutes REAL NOT NULL
+    );
+    INSERT INTO totals VALUES (1, 0, 0);
+    """,
+    """
+    UPDATE OR REPLACE courses SET meeting_id = REPLACE(TRIM(meeting_id), ' ', '');
+    UPDATE OR REPLACE attendance SET meeting_id = REPLACE(TRIM(meeting_id), ' ', '');
+    """,
+    """
+    ALTER TABLE courses ADD COLUMN scheduled_minutes INTEGER;
+    """,
+    """
+    CREATE TABLE attendance_v5 (
+        meeting_id TEXT NOT NULL,
+        instance_uuid TEXT NOT NULL DEFAULT '',
+        user_email TEXT NOT NULL DEFAULT '',
+        name TEXT NOT NULL DEFAULT '',
+        duration_minutes REAL NOT NULL DEFAULT 0,
+        sync_date TEXT,
+        PRIMARY KEY (meeting_id, instance_uuid, user_email, name)
+    );
+    INSERT INTO attendance_v5 (meeting_id, user_email, name, duration_minutes, sync_date)
+        SELECT meeting_id, user_email, name, duration_minutes, sync_date FROM attendance;
+    DROP TABLE attendance;
+    ALTER TABLE attendance_v5 RENAME TO attendance;
+    CREATE INDEX idx_attendance_email ON attendance(user_email);
+    CREATE INDEX idx_attendance_person ON attendance(meeting_id, user_email, name);
+    CREATE TABLE meeting_instances (
+        meeting_id TEXT NOT NULL,
+        uuid TEXT NOT NULL,
+        start_time TEXT,
+        participants INTEGER NOT NULL,
+        ingested_at TEXT,
+        PRIMARY KEY (meeting_id, uuid)
+    );
+    ALTER TABLE courses ADD COLUMN synced_through TEXT;
+    DROP TABLE meeting_rollup;
+    CREATE TABLE meeting_rollup (
+        meeting_id TEXT PRIMARY KEY,
+        instances INTEGER NOT NULL,
+        participants INTEGER NOT NULL,
+        total_minutes REAL NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE ingest_log (
+        batch_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        meeting_id TEXT NOT NULL,
+        instance_uuid TEXT NOT NULL,
+        start_time TEXT,
+        ingested_at TEXT
+    );
+    CREATE TABLE attendance_log (
+        batch_id INTEGER NOT NULL,
+        user_email TEXT NOT NULL DEFAULT '',
+        name TEXT NOT NULL DEFAULT '',
+        duration_minutes REAL NOT NULL DEFAULT 0,
+        sync_date TEXT
+    );
+    CREATE INDEX idx_attendance_log_batch ON attendance_log(batch_id);
+    """,
+    """
+    ALTER TABLE meeting_instances ADD COLUMN batch_id INTEGER NOT NULL DEFAULT 0;
+    """,
+]
+
+# Rows imported before per-instance sync form one pseudo-instance per meeting, with uuid '' and no start time
+LEGACY_INSTANCES = """
+    INSERT OR IGNORE INTO meeting_instances (meeting_id, uuid, start_time, participants, ingested_at, batch_id)
+        SELECT meeting_id, '', NULL, COUNT(*), NULL, 0 FROM attendance WHERE instance_uuid = '' GROUP BY meeting_id;
+"""
+
+# Recomputes every rollup from the attendance table; incremental updates keep them equal to this.
+# Run after every schema migration.
+REBUILD_ROLLUPS = """
+    DELETE FROM meeting_rollup;
+    INSERT INTO meeting_rollup
+        SELECT a.meeting_id, a.instances, p.participants, a.total_minutes
+        FROM (SELECT meeting_id, COUNT(DISTINCT instance_uuid) AS instances, SUM(duration_minutes) AS total_minutes
+              FROM attendance GROUP BY meeting_id) a
+        JOIN (SELECT meeting_id, COUNT(*) AS participants
+              FROM (SELECT DISTINCT meeting_id, user_email, name FROM attendance) GROUP BY meeting_id) p
+        USING (meeting_id);
+    DELETE FROM participant_rollup;
+    INSERT INTO participant_rollup
+        SELECT user_email, name, SUM(duration_minutes), COUNT(*) FROM attendance GROUP BY user_email, name;
+    UPDATE totals SET
+        participants = (SELECT COUNT(*) FROM participant_rollup),
+        total_minutes = (SELECT COALESCE(SUM(total_minutes), 0) FROM meeting_rollup);
+"""
+
+
+class AttendanceStore:
+    """SQLite-backed courses + attendance store. One instance is shared by every session in the process.
+
+    Synced instances are appended to an ingest log in a short transaction and folded into the
+    attendance and rollup tables by `compact`, which takes every pending batch (from any session or
+    process) in one pass. Reads go through a separate connection, so they never wait for a
+    compaction and `snapshot` gives several queries one consistent view (WAL).
+
+    `version` changes after every committed write, including writes by other processes sharing the
+    file; readers use it to tell whether derived data is stale.
+    """
+    def __init__(self, path=STORE_DB):
+        self.path = path
+        self._version = 0
+        self.listeners = []
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self.reader = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        self.read_lock = threading.RLock()
+        # Only asked for PRAGMA data_version, so checking the version never waits behind a long read
+        self.watcher = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        self.version_lock = threading.Lock()
+        self.data_version = self.watcher.execute("PRAGMA data_version").fetchone()[0]
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.compactor = None
+
+    def _migrate(self):
+        with self.lock:
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < len(MIGRATIONS):
+                scripts = "".join(MIGRATIONS[version:])
+                self.conn.executescript(
+                    f"BEGIN; {scripts} {REBUILD_ROLLUPS} {LEGACY_INSTANCES} PRAGMA user_version = {len(MIGRATIONS)}; COMMIT;")
+
+    def close(self):
+        self.stopping.set()
+        self.wake.set()
+        if self.compactor:
+            self.compactor.join()
+        self.conn.close()
+        self.reader.close()
+        self.watcher.close()
+
+    @contextmanager
+    def transaction(self):
+        with self.lock, metrics.timer("store_transaction_seconds"):
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            self._bump(force=True)
+
+    @property
+    def version(self):
+        """A counter that changes whenever the database has changed since it was last read.
+
+        PRAGMA data_version on the watcher connection changes after a commit on any other
+        connection, whether this store's writer or another process's, so a write elsewhere
+        invalidates derived data on the next lookup instead of only on this process's next write.
+        """
+        self._bump()
+        return self._version
+
+    def _bump(self, force=False):
+        with self.version_lock:
+            data_version = self.watcher.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self.data_version and not force:
+                return
+            self.data_version = data_version
+            self._version += 1
+            version = self._version
+        for listener in self.listeners:
+            listener(version)
+
+    def subscribe(self, listener):
+        """Call `listener(version)` after every committed write (seen by this process)."""
+        self.listeners.append(listener)
+
+    @contextmanager
+    def snapshot(self):
+        """Every query inside the block sees the same committed state, whatever is written meanwhile."""
+        with self.read_lock:
+            if self.reader.in_transaction:
+                yield
+                return
+            self.reader.execute("BEGIN")
+            try:
+                yield
+            finally:
+                self.reader.execute("COMMIT")
+
+    def query(self, sql, params=()):
+        """Run a SELECT into a frame typed per COLUMN_DTYPES/DATE_COLUMNS."""
+        with self.read_lock, metrics.timer("store_query_seconds"):
+            frame = pd.read_sql_query(sql, self.reader, params=params)
+        frame = typed(frame)
+        metrics.inc("store_rows_read_total", len(frame))
+        metrics.inc("store_bytes_read_total", int(frame.memory_usage(deep=True).sum()))
+        return frame
+
+    def iter_query(self, sql, params=(), chunk_rows=QUERY_CHUNK_ROWS, parse_dates=True):
+        """Yield the result of a SELECT as typed frames of at most `chunk_rows` rows.
+
+        Runs on a connection of its own inside one read transaction, so a long scan sees a
+        consistent snapshot without holding up other readers or writers. With `parse_dates=False`
+        dates stay as the ISO strings SQLite holds.
+        """
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        try:
+            conn.execute("PRAGMA query_only = ON")
+            conn.execute("BEGIN")
+            cursor = conn.execute(sql, params)
+            columns = [d[0] for d in cursor.description]
+            while True:
+                with metrics.timer("store_query_seconds"):
+                    rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                frame = typed(pd.DataFrame.from_records(rows, columns=columns), parse_dates=parse_dates)
+                metrics.inc("store_rows_read_total", len(frame))
+                metrics.inc("store_bytes_read_total", int(frame.memory_usage(deep=True).sum()))
+                yield frame
+        finally:
+            conn.close()
+
+    # --- courses ---
+    def courses(self, columns=COURSE_COLUMNS):
+        return self.query(f"SELECT {', '.join(columns)} FROM courses ORDER BY rowid")
+
+    def add_course(self, meeting_id, course_name, date_added, scheduled_minutes=None):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO courses (meeting_id, course_name, date_added, scheduled_minutes) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(meeting_id) DO UPDATE SET course_name = excluded.course_name, scheduled_minutes = excluded.scheduled_minutes",
+                (normalize_meeting_id(meeting_id), course_name, date_added, scheduled_minutes))
+
+    # --- attendance ---
+    def known_instances(self, meeting_ids=None):
+        """{meeting_id: uuids} of ingested or pending instances that started at or after the meeting's watermark.
+
+        Instances older than the watermark are known to be ingested, so they are never loaded.
+        """
+        sql = ("SELECT i.meeting_id, i.uuid FROM meeting_instances i JOIN courses c ON c.meeting_id = i.meeting_id "
+               "WHERE i.start_time >= c.synced_through "
+               "UNION SELECT meeting_id, instance_uuid FROM ingest_log")
+        params = ()
+        if meeting_ids is not None:
+            params = tuple(normalize_meeting_id(m) for m in meeting_ids)
+            sql = f"SELECT * FROM ({sql}) WHERE meeting_id IN ({', '.join('?' * len(params))})"
+        known = {}
+        with self.read_lock:
+            for meeting_id, uuid in self.reader.execute(sql, params):
+                known.setdefault(meeting_id, set()).add(uuid)
+        return known
+
+    def append_instances(self, batches, ingested_at=None):
+        """Append newly fetched meeting instances to the ingest log, one batch per instance.
+
+        `batches` is {meeting_id: [(uuid, start_time, rows), ...]}. This is a short insert-only
+        transaction; the rows reach the attendance tables at the next `compact`. Nothing is written
+        (and the store version is left alone) when there are no instances.
+        """
+        if not any(batches.values()):
+            return
+        with self.transaction() as conn:
+            for meeting_id, instances in batches.items():
+                meeting_id = normalize_meeting_id(meeting_id)
+                for uuid, start_time, rows in instances:
+                    batch_id = conn.execute(
+                        "INSERT INTO ingest_log (meeting_id, instance_uuid, start_time, ingested_at) VALUES (?, ?, ?, ?)",
+                        (meeting_id, uuid, start_time, ingested_at)).lastrowid
+                    rows = rows[["user_email", "name", "duration_minutes", "sync_date"]]
+                    conn.executemany(
+                        "INSERT INTO attendance_log (batch_id, user_email, name, duration_minutes, sync_date) VALUES (?, ?, ?, ?, ?)",
+                        ((batch_id, *r) for r in rows.itertuples(index=False, name=None)))
+                    metrics.inc("store_rows_written_total", len(rows))
+                    metrics.inc("store_bytes_written_total", int(rows.memory_usage(deep=True).sum()))
+        self.wake.set()
+
+    def pending_batches(self):
+        with self.read_lock:
+            return self.reader.execute("SELECT COUNT(*) FROM ingest_log").fetchone()[0]
+
+    def compact(self):
+        """Fold every pending ingest-log batch into attendance, rollups and watermarks, oldest first.
+
+        One transaction for the lot, so concurrent syncs share a single pass and a crash leaves the
+        log intact. A later batch for the same instance replaces the earlier one. Returns the number
+        of batches folded.
+        """
+        if not self.pending_batches():
+            return 0
+        with metrics.timer("store_compaction_seconds"), self.transaction() as conn:
+            batches = conn.execute(
+                "SELECT batch_id, meeting_id, instance_uuid, start_time, ingested_at FROM ingest_log ORDER BY batch_id").fetchall()
+            for batch_id, meeting_id, uuid, start_time, ingested_at in batches:
+                # Rows from before per-instance sync covered the whole meeting; instance data supersedes them
+                self._remove_instance(conn, meeting_id, '')
+                self._remove_instance(conn, meeting_id, uuid)
+                rows = conn.execute(
+                    f"INSERT OR REPLACE INTO attendance ({', '.join(ATTENDANCE_COLUMNS)}) "
+                    "SELECT ?, ?, user_email, name, duration_minutes, sync_date FROM attendance_log WHERE batch_id = ?",
+                    (meeting_id, uuid, batch_id)).rowcount
+                self._apply_rollups(conn, meeting_id, uuid, +1)
+                conn.execute("INSERT OR REPLACE INTO meeting_instances VALUES (?, ?, ?, ?, ?, ?)",
+                             (meeting_id, uuid, start_time, rows, ingested_at, batch_id))
+                conn.execute(
+                    "UPDATE courses SET synced_through = MAX(COALESCE(synced_through, ''), ?) WHERE meeting_id = ?",
+                    (start_time, meeting_id))
+                conn.execute("DELETE FROM attendance_log WHERE batch_id = ?", (batch_id,))
+                conn.execute("DELETE FROM ingest_log WHERE batch_id = ?", (batch_id,))
+        metrics.inc("store_batches_compacted_total", len(batches))
+        return len(batches)
+
+    def ingest_instances(self, batches, ingested_at=None):
+        """Append the instances to the ingest log and fold the log before returning.
+
+        Only the given instances are written; the rest of each meeting's history is untouched.
+        """
+        self.append_instances(batches, ingested_at)
+        self.compact()
+
+    def start_compactor(self, interval=COMPACT_INTERVAL):
+        """Fold the ingest log in a daemon thread: right after each append, and every `interval` seconds
+        for batches appended by other processes or left behind by an interrupted session."""
+        if self.compactor:
+            return
+
+        def run():
+            while not self.stopping.is_set():
+                self.wake.wait(interval)
+                self.wake.clear()
+                if self.stopping.is_set():
+                    break
+                try:
+                    self.compact()
+                except sqlite3.Error:
+                    metrics.inc("store_compaction_errors_total")
+
+        self.compactor = threading.Thread(target=run, name="store-compactor", daemon=True)
+        self.compactor.start()
+
+    def _remove_instance(self, conn, meeting_id, uuid):
+        self._apply_rollups(conn, meeting_id, uuid, -1)
+        conn.execute("DELETE FROM attendance WHERE meeting_id = ? AND instance_uuid = ?", (meeting_id, uuid))
+        conn.execute("DELETE FROM meeting_instances WHERE meeting_id = ? AND uuid = ?", (meeting_id, uuid))
+
+    def _apply_rollups(self, conn, meeting_id, uuid, sign):
+        """Add (sign=+1) or subtract (sign=-1) one instance's current attendance rows from the rollups.
+
+        Cost is proportional to the instance's size, not to the history in the store.
+        """
+        key = (meeting_id, uuid)
+        count, minutes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(duration_minutes), 0) FROM attendance WHERE meeting_id = ? AND instance_uuid = ?", key).fetchone()
+        if not count:
+            return
+
+        new_people = 0
+        if sign > 0:
+            new_people = conn.execute(
+                "SELECT COUNT(*) FROM attendance a WHERE a.meeting_id = ? AND a.instance_uuid = ? AND NOT EXISTS "
+                "(SELECT 1 FROM participant_rollup p WHERE p.user_email = a.user_email AND p.name = a.name)", key).fetchone()[0]
+
+        conn.execute(
+            "INSERT INTO participant_rollup (user_email, name, total_minutes, sessions) "
+            "SELECT user_email, name, ? * duration_minutes, ? FROM attendance WHERE meeting_id = ? AND instance_uuid = ? AND true "
+            "ON CONFLICT (user_email, name) DO UPDATE SET "
+            "total_minutes = total_minutes + excluded.total_minutes, sessions = sessions + excluded.sessions",
+            (sign, sign, *key))
+
+        gone_people = 0
+        if sign < 0:
+            gone_people = conn.execute(
+                "DELETE FROM participant_rollup WHERE sessions <= 0 AND (user_email, name) IN "
+                "(SELECT user_email, name FROM attendance WHERE meeting_id = ? AND instance_uuid = ?)", key).rowcount
+
+        # People seen in no other instance of this meeting change its distinct participant count
+        only_here = conn.execute(
+            "SELECT COUNT(*) FROM attendance a WHERE a.meeting_id = ? AND a.instance_uuid = ? AND NOT EXISTS "
+            "(SELECT 1 FROM attendance b INDEXED BY idx_attendance_person WHERE b.meeting_id = a.meeting_id AND b.user_email = a.user_email "
+            "AND b.name = a.name AND b.instance_uuid <> a.instance_uuid)", key).fetchone()[0]
+        conn.execute(
+            "INSERT INTO meeting_rollup VALUES (?, ?, ?, ?) ON CONFLICT (meeting_id) DO UPDATE SET "
+            "instances = instances + excluded.instances, participants = participants + excluded.participants, "
+            "total_minutes = total_minutes + excluded.total_minutes",
+            (meeting_id, sign, sign * only_here, sign * minutes))
+        conn.execute("DELETE FROM meeting_rollup WHERE meeting_id = ? AND instances <= 0", (meeting_id,))
+        conn.execute(
+            "UPDATE totals SET participants = participants + ?, total_minutes = total_minutes + ?",
+            (new_people - gone_people, sign * minutes))
+
+    # --- rollups ---
+    def totals(self):
+        return self.query("SELECT participants, total_minutes FROM totals").iloc[0]
+
+    def meeting_rollup(self, columns=("meeting_id", "instances", "participants", "total_minutes")):
+        return self.query(f"SELECT {', '.join(columns)} FROM meeting_rollup")
+
+    def participant_rollup(self):
+        return self.query("SELECT user_email, name, total_minutes, sessions FROM participant_rollup")
+
+    def _rebuild_rollups(self, conn):
+        for statement in REBUILD_ROLLUPS.split(";"):
+            if statement.strip():
+                conn.execute(statement)
+
+    # --- one-shot import of the old CSV files ---
+    def import_csv(self, courses_csv, attendance_csv):
+        """Load the legacy CSV databases (if still present), then rename them to *.migrated."""
+        present = [p for p in (courses_csv, attendance_csv) if os.path.exists(p)]
+        if not present:
+            return
+        with self.transaction() as conn:
+            if os.path.exists(courses_csv):
+                courses = pd.read_csv(courses_csv, dtype={"meeting_id": str}).dropna(subset=["meeting_id"])
+                courses["meeting_id"] = courses["meeting_id"].map(normalize_meeting_id)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO courses (meeting_id, course_name, date_added) VALUES (?, ?, ?)",
+                    courses[["meeting_id", "course_name", "date_added"]].itertuples(index=False, name=None))
+            if os.path.exists(attendance_csv):
+                for chunk in pd.read_csv(attendance_csv, dtype={"meeting_id": str, "user_email": str, "name": str}, chunksize=50_000):
+                    chunk = chunk.fillna({"user_email": "", "name": "", "duration_minutes": 0})
+                    chunk["meeting_id"] = chunk["meeting_id"].map(normalize_meeting_id)
+                    conn.executemany(
+                        f"INSERT OR REPLACE INTO attendance ({', '.join(LEGACY_ATTENDANCE_COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+                        chunk[LEGACY_ATTENDANCE_COLUMNS].itertuples(index=False, name=None))
+            self._rebuild_rollups(conn)
+            conn.execute(LEGACY_INSTANCES)
+        for p in present:
+            os.replace(p, p + ".migrated")
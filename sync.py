@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+import metrics
+from attendance import AttendanceAccumulator, to_epoch_seconds
+from zoom_client import ZoomAPIError
+
+SYNC_WORKERS = 8
+
+
+def aggregate_participants(pages, meeting_id, window=None):
+    """Fold participant pages into attendance rows.
+
+    Attended time is the union of each person's join/leave intervals, so rejoins and second
+    devices are not double-counted. Only merged intervals are kept between pages.
+    """
+    acc = AttendanceAccumulator(window)
+    for parts in pages:
+        acc.add(parts)
+
+    new_d = acc.result()
+    new_d['duration_minutes'] = (new_d['seconds']/60).round(1)
+    new_d['meeting_id'] = str(meeting_id)
+    new_d['sync_date'] = datetime.now().strftime("%Y-%m-%d")
+    return new_d[['meeting_id', 'user_email', 'name', 'duration_minutes', 'sync_date']]
+
+
+@metrics.timed("sync_meeting_seconds")
+def sync_meeting(client, course, known=frozenset()):
+    """Fetch attendance for the course's ended instances that are not in the store yet.
+
+    Instances that started before the course's watermark (`synced_through`) are skipped without a
+    lookup; `known` holds the ingested UUIDs at or after it. With a scheduled length, only time inside
+    each instance's scheduled window counts. Returns [(uuid, start_time, rows), ...].
+    """
+    watermark = course.synced_through if isinstance(course.synced_through, str) else ''
+    new = [i for i in client.list_instances(course.meeting_id) if i['start_time'] >= watermark and i['uuid'] not in known]
+
+    results = []
+    for inst in new:
+        window = None
+        if course.scheduled_minutes and pd.notna(course.scheduled_minutes):
+            start = to_epoch_seconds([inst['start_time']])[0]
+            window = (start, start + course.scheduled_minutes * 60)
+        rows = aggregate_participants(client.iter_participants(inst['uuid']), course.meeting_id, window)
+        results.append((inst['uuid'], inst['start_time'], rows))
+    metrics.inc("sync_instances_total", len(results))
+    return results
+
+
+def sync_meetings(client, courses, known, workers=SYNC_WORKERS):
+    """Fetch many courses concurrently; yields (meeting_id, instances, error) as each one finishes."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(sync_meeting, client, c, known.get(c.meeting_id, frozenset())): c.meeting_id
+                   for c in courses.itertuples(index=False)}
+        for fut in as_completed(futures):
+            try:
+                yield futures[fut], fut.result(), None
+            except ZoomAPIError as err:
+                yield futures[fut], None, str(err)
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_zoom import FakeZoom
+from store import AttendanceStore
+from zoom_client import RateLimiter, ZoomClient
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AttendanceStore(str(tmp_path / "attendance.db"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def fake():
+    fake = FakeZoom(records=400, people=120, instances=3, seed=1)
+    fake.start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def client(fake):
+    client = ZoomClient("test", "test", "http://localhost", limiter=RateLimiter(1000, 10**9), **fake.endpoints())
+    client.exchange_code("fake-code")
+    yield client
+    client.session.close()
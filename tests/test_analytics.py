@@ -0,0 +1,39 @@
+import pandas as pd
+
+from analytics import AttendanceMatrix, attendance_rates
+from test_store import sync_all, write_legacy_csv
+
+
+def assert_rates_equal(got, expected):
+    assert got["overall"] == expected["overall"]
+    for key in ("courses", "students", "sessions", "weeks", "retention"):
+        pd.testing.assert_frame_equal(got[key], expected[key], check_dtype=False, obj=key)
+
+
+def fresh_rates(store, present_minutes=5):
+    matrix = AttendanceMatrix()
+    matrix.refresh(store)
+    return attendance_rates(matrix, present_minutes)
+
+
+def test_incremental_rates_match_fresh_matrix(store, client, fake, tmp_path):
+    store.import_csv(*write_legacy_csv(tmp_path))
+    store.add_course("222222222", "Plain", "2026-01-01")
+    matrix = AttendanceMatrix()
+    matrix.refresh(store)
+    assert_rates_equal(attendance_rates(matrix), fresh_rates(store))
+
+    # New instances, legacy rows replaced by instance data
+    synced = sync_all(store, client)
+    matrix.refresh(store)
+    assert len(matrix) > 0
+    assert_rates_equal(attendance_rates(matrix), fresh_rates(store))
+
+    # A later instance, then a re-sync of an earlier one with fewer rows
+    fake.instances += 1
+    sync_all(store, client)
+    uuid, start_time, rows = synced["222222222"][0]
+    store.ingest_instances({"222222222": [(uuid, start_time, rows.iloc[::3])]})
+    matrix.refresh(store)
+    for present in (1, 5, 30):
+        assert_rates_equal(attendance_rates(matrix, present), fresh_rates(store, present))
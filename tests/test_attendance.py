@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import pytest
+
+from attendance import AttendanceAccumulator, CHUNK_ROWS
+from fake_zoom import FIRST_INSTANCE
+
+
+def epoch(value):
+    return int(datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=FIRST_INSTANCE.tzinfo).timestamp())
+
+
+def brute_force_seconds(records, window=None):
+    """Attended seconds per (email, name) by marking every covered second."""
+    covered = {}
+    for r in records:
+        start, end = epoch(r["join_time"]), epoch(r["leave_time"])
+        if window is not None:
+            start, end = max(start, window[0]), min(end, window[1])
+        covered.setdefault((r["user_email"], r["name"]), set()).update(range(start, end))
+    return {key: len(seconds) for key, seconds in covered.items() if seconds}
+
+
+@pytest.mark.parametrize("window", [None, "scheduled"])
+@pytest.mark.parametrize("chunk_rows", [CHUNK_ROWS, 250])
+def test_union_matches_brute_force(client, window, chunk_rows):
+    uuid = client.list_instances("123456789")[1]["uuid"]
+    pages = list(client.iter_participants(uuid))
+    records = [r for page in pages for r in page]
+    if window == "scheduled":
+        start = epoch(client.list_instances("123456789")[1]["start_time"])
+        window = (start, start + 30 * 60)
+
+    acc = AttendanceAccumulator(window, chunk_rows=chunk_rows)
+    for page in pages:
+        acc.add(page)
+    result = acc.result()
+
+    got = {(e, n): s for e, n, s in result[["user_email", "name", "seconds"]].itertuples(index=False)}
+    assert len(pages) > 1
+    assert got == pytest.approx(brute_force_seconds(records, window))
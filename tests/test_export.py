@@ -0,0 +1,50 @@
+import io
+
+import pandas as pd
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+import export
+from test_store import sync_all
+
+
+@pytest.fixture
+def synced_store(store, client):
+    store.add_course("222222222", "Plain", "2026-01-01")
+    store.add_course("555555555", "Other", "2026-01-01")
+    sync_all(store, client)
+    return store
+
+
+def read_export(data, fmt, compression):
+    if fmt == "parquet":
+        return pd.read_parquet(io.BytesIO(data))
+    return pd.read_csv(io.BytesIO(data), dtype={"meeting_id": str}, compression="gzip" if compression == "gzip" else None)
+
+
+@pytest.mark.parametrize("fmt, compression", [("csv", "none"), ("csv", "gzip"), ("parquet", "zstd")])
+def test_export_round_trips_through_download_button(synced_store, fmt, compression):
+    if fmt not in export.FORMATS:
+        pytest.skip("pyarrow is not installed")
+    # What st.download_button does with the value returned by its callable
+    data, _ = convert_data_to_bytes_and_infer_mime(export.export_file(synced_store, fmt, compression, chunk_rows=100),
+                                                   unsupported_error=TypeError("unsupported"))
+    frame = read_export(data, fmt, compression)
+
+    expected = synced_store.query("SELECT meeting_id, instance_uuid, user_email, name FROM attendance")
+    assert list(frame.columns) == export.EXPORT_COLUMNS
+    assert len(frame) == len(expected) > 100
+    assert set(frame["course_name"]) == {"Plain", "Other"}
+
+
+def test_export_filters(synced_store):
+    data = export.export_file(synced_store, "csv", meeting_ids=["222 222 222"], participant="STUDENT1")
+    frame = read_export(data, "csv", "none")
+    assert len(frame) > 0
+    assert set(frame["meeting_id"]) == {"222222222"}
+    assert frame["user_email"].fillna("").str.lower().str.contains("student1").add(
+        frame["name"].str.lower().str.contains("student1")).all()
+
+    # LIKE wildcards in the participant filter are literal
+    assert len(read_export(export.export_file(synced_store, "csv", participant="%"), "csv", "none")) == 0
+    assert len(read_export(export.export_file(synced_store, "csv", participant="student_"), "csv", "none")) == 0
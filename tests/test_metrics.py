@@ -0,0 +1,18 @@
+import json
+
+from metrics import Registry
+
+
+def test_mixed_label_value_types_sort_and_export():
+    registry = Registry()
+    registry.inc("zoom_api_calls_total", endpoint="users/me", status=200)
+    registry.inc("zoom_api_calls_total", endpoint="users/me", status="error")
+    registry.inc("zoom_api_calls_total", endpoint="users/me", status="200")
+    registry.observe("zoom_api_request_seconds", 0.02, endpoint="users/me", status=429)
+    registry.observe("zoom_api_request_seconds", 0.03, endpoint="users/me", status="error")
+
+    rows = registry.snapshot()
+    calls = [r for r in rows if r["name"] == "zoom_api_calls_total"]
+    assert [(r["labels"]["status"], r["value"]) for r in calls] == [("200", 2), ("error", 1)]
+    assert len([json.loads(line) for line in registry.json_lines().splitlines()]) == len(rows)
+    assert 'zoomattendance_zoom_api_calls_total{endpoint="users/me",status="error"} 1' in registry.prometheus()
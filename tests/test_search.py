@@ -0,0 +1,40 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from search import ParticipantIndex
+
+ALPHABET = "aejno .@_"
+
+
+@pytest.fixture(scope="module")
+def directory():
+    rng = random.Random(0)
+    names = ["".join(rng.choice("aejno ") for _ in range(rng.randint(2, 14))) for _ in range(2000)]
+    emails = [n.strip().replace(" ", ".") + ("@x.edu" if i % 7 else "") for i, n in enumerate(names)]
+    return pd.DataFrame({"name": names, "user_email": emails})
+
+
+def substring_rows(frame, query):
+    text = (frame["name"] + "\n" + frame["user_email"]).str.lower()
+    return np.flatnonzero(text.str.contains(query.strip().lower(), regex=False))
+
+
+@pytest.mark.parametrize("length", [1, 2, 3, 4, 6])
+def test_search_matches_substring(directory, length):
+    index = ParticipantIndex(directory)
+    rng = random.Random(length)
+    for _ in range(300):
+        query = "".join(rng.choice(ALPHABET) for _ in range(length))
+        if not query.strip():
+            continue
+        assert np.array_equal(index.search(query), substring_rows(directory, query)), query
+
+
+def test_repeated_trigram_query_is_checked(directory):
+    index = ParticipantIndex(pd.DataFrame({"name": ["eee", "eeeee", "Joanna"], "user_email": ["", "", ""]}))
+    assert index.search("eeeee").tolist() == [1]
+    assert index.search("AN").tolist() == [2]
+    assert index.search("  ").tolist() == [0, 1, 2]
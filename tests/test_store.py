@@ -0,0 +1,80 @@
+import pandas as pd
+
+from store import AttendanceStore
+from sync import sync_meetings
+
+ROLLUP_QUERIES = {
+    "meeting_rollup": "SELECT meeting_id, instances, participants, ROUND(total_minutes, 3) FROM meeting_rollup ORDER BY meeting_id",
+    "participant_rollup": "SELECT user_email, name, ROUND(total_minutes, 3), sessions FROM participant_rollup ORDER BY user_email, name",
+    "totals": "SELECT participants, ROUND(total_minutes, 3) FROM totals",
+}
+
+
+def rollups(store):
+    return {table: store.conn.execute(sql).fetchall() for table, sql in ROLLUP_QUERIES.items()}
+
+
+def rebuilt_rollups(store):
+    with store.transaction() as conn:
+        store._rebuild_rollups(conn)
+    return rollups(store)
+
+
+def sync_all(store, client):
+    courses = store.courses()
+    synced = {mid: instances for mid, instances, err in sync_meetings(client, courses, store.known_instances()) if not err}
+    store.ingest_instances(synced)
+    return synced
+
+
+def write_legacy_csv(tmp_path):
+    courses = tmp_path / "courses.csv"
+    attendance = tmp_path / "attendance_cache.csv"
+    pd.DataFrame({"meeting_id": ["111 111 111", "333333333"], "course_name": ["Legacy", "Legacy only"],
+                  "date_added": "2025-09-01"}).to_csv(courses, index=False)
+    pd.DataFrame({"meeting_id": ["111111111", "111111111", "333333333"],
+                  "user_email": ["student1@example.edu", "old@example.edu", "student2@example.edu"],
+                  "name": ["Student 1", "Old Student", "Student 2"],
+                  "duration_minutes": [30.0, 12.5, 45.0], "sync_date": "2025-09-02"}).to_csv(attendance, index=False)
+    return str(courses), str(attendance)
+
+
+def test_incremental_rollups_match_rebuild(store, client, tmp_path):
+    store.import_csv(*write_legacy_csv(tmp_path))
+    store.add_course("222222222", "Plain", "2026-01-01")
+    assert rollups(store) == rebuilt_rollups(store)
+
+    # Instance data replaces the legacy whole-meeting rows of 111111111
+    synced = sync_all(store, client)
+    assert set(synced) == {"111111111", "222222222", "333333333"}
+    assert store.query("SELECT COUNT(*) AS n FROM attendance WHERE instance_uuid = ''")["n"][0] == 0
+    assert rollups(store) == rebuilt_rollups(store)
+
+    # Re-syncing an instance with different rows replaces it
+    uuid, start_time, rows = synced["222222222"][0]
+    store.ingest_instances({"222222222": [(uuid, start_time, rows.iloc[::2])]})
+    assert rollups(store) == rebuilt_rollups(store)
+    store.ingest_instances({"222222222": [(uuid, start_time, rows)]})
+    assert rollups(store) == rebuilt_rollups(store)
+
+
+def test_sync_with_nothing_new_keeps_version(store, client):
+    store.add_course("222222222", "Plain", "2026-01-01")
+    sync_all(store, client)
+    version = store.version
+    assert not any(sync_all(store, client).values())
+    assert store.version == version
+
+
+def test_version_sees_writes_from_another_connection(store, tmp_path):
+    seen = []
+    store.subscribe(seen.append)
+    version = store.version
+    other = AttendanceStore(store.path)
+    try:
+        other.add_course("444444444", "Elsewhere", "2026-01-01")
+    finally:
+        other.close()
+    assert store.version > version
+    assert seen == [store.version]
+    assert store.version == seen[-1]
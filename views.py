@@ -0,0 +1,64 @@
+from analytics import attendance_rates
+from search import ParticipantIndex
+
+# Data preparation for each page, separated from the Streamlit rendering so it can be cached and
+# benchmarked on its own. Every function takes the store and returns data that must not be mutated.
+# Builders that run several queries do so inside store.snapshot(), so a concurrent write cannot
+# leave them mixing two versions of the data.
+
+
+def dashboard_summary(store):
+    with store.snapshot():
+        return {
+            "totals": store.totals(),
+            "courses": int(store.query("SELECT COUNT(*) AS n FROM courses").iloc[0]['n']),
+            "recent": store.query(
+                "SELECT * FROM (SELECT rowid, meeting_id, course_name FROM courses ORDER BY rowid DESC LIMIT 3) ORDER BY rowid"),
+        }
+
+
+def participant_index(store):
+    return ParticipantIndex(store.participant_rollup().sort_values('name', key=lambda s: s.str.lower()))
+
+
+def sessions_summary(store):
+    """One row per course with its rollup totals, keyed by the normalized meeting ID."""
+    with store.snapshot():
+        courses = store.courses(["meeting_id", "course_name", "scheduled_minutes", "synced_through"])
+        rollup = store.meeting_rollup()
+    summary = courses.merge(rollup, on='meeting_id', how='left')
+    summary['participants'] = summary['participants'].fillna(0).astype('int32')
+    summary['instances'] = summary['instances'].fillna(0).astype('int32')
+    summary['hours'] = summary['total_minutes'].fillna(0) / 60
+    return summary
+
+
+def meeting_hours(store):
+    with store.snapshot():
+        rollup = store.meeting_rollup(["meeting_id", "total_minutes"])
+        courses = store.courses(["meeting_id", "course_name"])
+    stats = rollup.merge(courses, on='meeting_id', how='left')
+    stats['hours'] = (stats['total_minutes']/60).round(1)
+    return stats
+
+
+def attendance_report(store, matrix, present_minutes):
+    """attendance_rates() for the store's current data, with course names and participant emails/names attached."""
+    matrix.refresh(store)
+    rates = attendance_rates(matrix, present_minutes)
+    with store.snapshot():
+        courses = store.courses(["meeting_id", "course_name"])
+        people = store.query("SELECT rowid AS person, user_email, name FROM participant_rollup")
+    for key in ("courses", "retention"):
+        rates[key] = rates[key].merge(courses, on='meeting_id', how='left')
+        rates[key]['course_name'] = rates[key]['course_name'].fillna(rates[key]['meeting_id'])
+    rates["students"] = rates["students"].merge(people, on='person', how='left')
+    return rates
+
+
+PAGE_DATA = {
+    "Dashboard": dashboard_summary,
+    "Participants": participant_index,
+    "Sessions": sessions_summary,
+    "Reports": meeting_hours,
+}
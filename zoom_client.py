@@ -0,0 +1,243 @@
+import base64
+import threading
+import time
+from datetime import datetime, date
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+AUTHORIZE_URL = "https://zoom.us/oauth/authorize"
+TOKEN_URL = "https://zoom.us/oauth/token"
+API_BASE = "https://api.zoom.us/v2"
+
+# Zoom rate limits for "heavy" report endpoints (Pro plan). Shared by every session in this process.
+ZOOM_RATE_PER_SEC = 10
+ZOOM_DAILY_LIMIT = 30000
+ZOOM_MAX_RETRIES = 5
+ZOOM_MAX_RETRY_WAIT = 60
+
+# (connect, read) seconds for every Zoom call
+ZOOM_TIMEOUT = (5, 30)
+# Refresh the access token this many seconds before Zoom expires it
+TOKEN_REFRESH_MARGIN = 120
+POOL_SIZE = 16
+
+
+class ZoomAPIError(Exception):
+    pass
+
+
+class RateLimiter:
+    """Token bucket for Zoom's per-second limit, plus a daily quota and a shared Retry-After pause."""
+    def __init__(self, rate, daily_limit):
+        self.rate = rate
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.daily_limit = daily_limit
+        self.day = date.today()
+        self.used_today = 0
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if date.today() != self.day:
+                    self.day, self.used_today = date.today(), 0
+                if self.used_today >= self.daily_limit:
+                    raise ZoomAPIError("Daily Zoom API limit reached, try again tomorrow.")
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                wait = self.paused_until - now
+                if wait <= 0 and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.used_today += 1
+                    return
+                if wait <= 0:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def make_session(pool_size=POOL_SIZE):
+    """A keep-alive requests.Session whose connection pool is large enough for the sync workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def retry_after_seconds(res, attempt):
+    header = res.headers.get("Retry-After")
+    if not header:
+        return 2 ** attempt
+    try:
+        return max(float(header), 0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(header)
+        return max((when - datetime.now(when.tzinfo)).total_seconds(), 0)
+    except (TypeError, ValueError):
+        return 2 ** attempt
+
+
+def encode_meeting_id(meeting_id):
+    """Path segment for a meeting ID or instance UUID; Zoom wants UUIDs with "/" at the start or "//" double-encoded."""
+    meeting_id = str(meeting_id).replace(" ", "")
+    encoded = quote(meeting_id, safe="")
+    if meeting_id.startswith("/") or "//" in meeting_id:
+        encoded = quote(encoded, safe="")
+    return encoded
+
+
+def login_url(client_id, redirect_uri, authorize_url=AUTHORIZE_URL):
+    """The OAuth authorize URL; needs no client (and so no HTTP session)."""
+    params = {"response_type": "code", "client_id": client_id, "redirect_uri": redirect_uri}
+    return f"{authorize_url}?{urlencode(params)}"
+
+
+def error_message(res):
+    try:
+        return res.json().get('message', 'Unknown error')
+    except ValueError:
+        return 'Unknown error'
+
+
+class ZoomClient:
+    """OAuth + REST client for one logged-in user.
+
+    The HTTP session and rate limiter are meant to be shared process-wide; the tokens belong to
+    this client. The access token is refreshed before it expires, so long batch syncs keep working.
+    """
+    def __init__(self, client_id, client_secret, redirect_uri, session=None, limiter=None,
+                 authorize_url=AUTHORIZE_URL, token_url=TOKEN_URL, api_base=API_BASE):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.redirect_uri = redirect_uri
+        self.session = session or make_session()
+        self.limiter = limiter
+        self.authorize_url = authorize_url
+        self.token_url = token_url
+        self.api_base = api_base.rstrip("/")
+        self.token = None
+        self.token_lock = threading.Lock()
+
+    # --- tokens ---
+    def _token_request(self, params):
+        auth_string = f"{self.client_id}:{self.client_secret}"
+        b64_auth = base64.b64encode(auth_string.encode()).decode()
+        headers = {"Authorization": f"Basic {b64_auth}", "Content-Type": "application/x-www-form-urlencoded"}
+        try:
+            with metrics.timer("zoom_api_request_seconds", endpoint="oauth_token"):
+                res = self.session.post(self.token_url, headers=headers, params=params, timeout=ZOOM_TIMEOUT)
+        except requests.RequestException as err:
+            metrics.inc("zoom_api_calls_total", endpoint="oauth_token", status="error")
+            raise ZoomAPIError(f"Connection failed: {err}")
+        metrics.inc("zoom_api_calls_total", endpoint="oauth_token", status=res.status_code)
+        if res.status_code != 200:
+            raise ZoomAPIError(f"Zoom Auth Error {res.status_code}: {error_message(res)}")
+        data = res.json()
+        self.token = {
+            "access_token": data["access_token"],
+            "refresh_token": data.get("refresh_token", (self.token or {}).get("refresh_token")),
+            "expires_at": time.time() + data.get("expires_in", 3600),
+        }
+        return data
+
+    def exchange_code(self, auth_code):
+        with self.token_lock:
+            return self._token_request({"grant_type": "authorization_code", "code": auth_code, "redirect_uri": self.redirect_uri})
+
+    def refresh(self, force=False):
+        with self.token_lock:
+            if self.token is None:
+                raise ZoomAPIError("Not logged in to Zoom.")
+            if not force and time.time() < self.token["expires_at"] - TOKEN_REFRESH_MARGIN:
+                return
+            if not self.token.get("refresh_token"):
+                raise ZoomAPIError("Zoom session expired, please log in again.")
+            self._token_request({"grant_type": "refresh_token", "refresh_token": self.token["refresh_token"]})
+
+    def access_token(self):
+        self.refresh()
+        return self.token["access_token"]
+
+    # --- REST ---
+    def get(self, path, params=None):
+        """GET an API path, retrying 429/5xx/connection errors with exponential backoff."""
+        url = f"{self.api_base}/{path.lstrip('/')}"
+        # Last path segment ("instances", "participants", ...) so IDs do not explode the label set
+        endpoint = path.rstrip('/').rsplit('/', 1)[-1]
+        refreshed = False
+        attempt = 0
+        while True:
+            if self.limiter: self.limiter.acquire()
+            headers = {"Authorization": f"Bearer {self.access_token()}"}
+            try:
+                with metrics.timer("zoom_api_request_seconds", endpoint=endpoint):
+                    res = self.session.get(url, headers=headers, params=params, timeout=ZOOM_TIMEOUT)
+            except requests.RequestException as err:
+                metrics.inc("zoom_api_calls_total", endpoint=endpoint, status="error")
+                if attempt >= ZOOM_MAX_RETRIES:
+                    raise ZoomAPIError(f"Connection failed: {err}")
+                time.sleep(0.5 * 2 ** attempt)
+                attempt += 1
+                continue
+
+            metrics.inc("zoom_api_calls_total", endpoint=endpoint, status=res.status_code)
+            metrics.inc("zoom_api_bytes_read_total", len(res.content), endpoint=endpoint)
+            if res.status_code == 200:
+                return res.json()
+            if res.status_code == 401 and not refreshed:
+                self.refresh(force=True)
+                refreshed = True
+                continue
+            if res.status_code == 429 and attempt < ZOOM_MAX_RETRIES:
+                wait = retry_after_seconds(res, attempt)
+                if wait > ZOOM_MAX_RETRY_WAIT:
+                    raise ZoomAPIError(f"Zoom rate limit reached, retry after {res.headers.get('Retry-After')}")
+                if self.limiter: self.limiter.pause(wait)
+                else: time.sleep(wait)
+                attempt += 1
+                continue
+            if res.status_code >= 500 and attempt < ZOOM_MAX_RETRIES:
+                time.sleep(0.5 * 2 ** attempt)
+                attempt += 1
+                continue
+            raise ZoomAPIError(f"Zoom Error {res.status_code}: {error_message(res)}")
+
+    def me(self):
+        """Profile of the logged-in user (id, email, ...)."""
+        return self.get("users/me")
+
+    def list_instances(self, meeting_id):
+        """Ended instances ({uuid, start_time}) of a meeting, oldest first."""
+        body = self.get(f"past_meetings/{encode_meeting_id(meeting_id)}/instances")
+        return sorted(body.get('meetings', []), key=lambda m: m.get('start_time', ''))
+
+    def iter_participants(self, meeting_id):
+        """Yield participant records one page at a time, following next_page_token until exhausted.
+
+        `meeting_id` may be a meeting ID (latest instance) or an instance UUID.
+        """
+        params = {"page_size": 300}
+
+        # Using "Past Meetings" endpoint (Works with Basic/Pro permissions)
+        while True:
+            body = self.get(f"past_meetings/{encode_meeting_id(meeting_id)}/participants", params)
+            yield body.get('participants', [])
+
+            next_token = body.get('next_page_token')
+            if not next_token:
+                break
+            params["next_page_token"] = next_token